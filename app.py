@@ -1,18 +1,71 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Query
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse, FileResponse, Response, StreamingResponse
 from typing import Optional, List
+from collections import OrderedDict
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager, contextmanager
+from concurrent.futures import ProcessPoolExecutor
 import os
+import aiofiles
+import asyncio
+import multiprocessing
+import base64
+import bisect
+import contextvars
+import time
 import uuid
-import shutil
 import json
 import hashlib
+import math
+import mimetypes
+import re
 import secrets
-from datetime import datetime
+import sqlite3
+import sys
+import threading
+import zipfile
+import gzip
+from datetime import datetime, timedelta
 from pathlib import Path
 
-app = FastAPI(title="Our Forever - Couple Album")
+try:
+    import fcntl
+except ImportError:  # Windows: locks are process-local only
+    fcntl = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # stdlib json
+    orjson = None
+
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = [
+        asyncio.create_task(session_sweep_loop()),
+        asyncio.create_task(event_log_compact_loop()),
+        asyncio.create_task(counters_reconcile_loop()),
+    ]
+    await asyncio.to_thread(build_static_assets)
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        broker.close()
+        compact_event_logs()
+        shutdown_process_pool()
+
+
+app = FastAPI(title="Our Forever - Couple Album", lifespan=lifespan)
 
 # Create directories
 UPLOAD_DIR = Path("uploads")
@@ -25,10 +78,21 @@ USERS_FILE = Path("users.json")
 SESSIONS_FILE = Path("sessions.json")
 MEDIA_FILE = Path("media.json")
 NOTES_FILE = Path("notes.json")
+TIMELINE_FILE = Path("timeline.json")
+KISSES_FILE = Path("kisses.json")
+MOODS_FILE = Path("moods.json")
+BLOBS_FILE = Path("blobs.json")
+COUNTERS_FILE = Path("counters.json")
+IMPORTS_FILE = Path("imports.json")
+KISSES_LOG_FILE = Path("kisses.log.jsonl")
+MOODS_LOG_FILE = Path("moods.log.jsonl")
+
+# Storage engine: "json" (flat files above) or "sqlite"
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")
+SQLITE_DB_FILE = Path(os.environ.get("SQLITE_DB_FILE", "love_album.db"))
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+STATIC_DIR = Path("static")
+STATIC_CACHE_DIR = Path(".static_cache")  # precompressed static variants
 
 # Templates
 templates = Jinja2Templates(directory="templates")
@@ -38,145 +102,1634 @@ ALLOWED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 ALLOWED_VIDEO_EXTENSIONS = {".mp4", ".webm", ".mov", ".avi", ".mkv"}
 
 
+# ==================== Metrics ====================
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+THROUGHPUT_BUCKETS = tuple(2 ** n * 1024 * 1024 for n in range(-2, 10))  # 256 KB/s .. 512 MB/s
+SLOW_REQUEST_SECONDS = float(os.environ.get("SLOW_REQUEST_MS", 0)) / 1000  # 0 disables the slow-request log
+
+
+def format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter keyed by label values, rendered in Prometheus text format"""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values, rendered in Prometheus text format"""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # labels -> [per-bucket counts (last is +Inf), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    le = format_labels(self.label_names, labels, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                lines.append(f"{self.name}_sum{format_labels(self.label_names, labels)} {total}")
+                lines.append(f"{self.name}_count{format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time until the response starts, per route.",
+    ("method", "route", "status")
+)
+PHASE_LATENCY = Histogram(
+    "app_phase_duration_seconds", "Time spent in instrumented hot paths (phases may nest).", ("phase",)
+)
+STORE_BYTES = Counter("app_store_bytes_total", "Bytes read from and written to each store.", ("store", "direction"))
+UPLOAD_BYTES = Counter("app_upload_bytes_total", "Bytes of uploaded or imported media copied to disk.", ("source",))
+UPLOAD_THROUGHPUT = Histogram(
+    "app_upload_throughput_bytes_per_second", "Copy throughput of each uploaded or imported file.",
+    ("source",), THROUGHPUT_BUCKETS
+)
+METRICS = [REQUEST_LATENCY, PHASE_LATENCY, STORE_BYTES, UPLOAD_BYTES, UPLOAD_THROUGHPUT]
+
+_request_phases = contextvars.ContextVar("request_phases", default=None)  # phase -> seconds for this request
+
+@contextmanager
+def timed(phase: str):
+    """Record the duration of a block as `phase`, also in the current request's breakdown"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        PHASE_LATENCY.observe(elapsed, phase)
+        phases = _request_phases.get()
+        if phases is not None:
+            phases[phase] = phases.get(phase, 0.0) + elapsed
+
+def record_upload(source: str, size: int, elapsed: float):
+    UPLOAD_BYTES.inc(size, source)
+    if elapsed > 0:
+        UPLOAD_THROUGHPUT.observe(size / elapsed, source)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    phases = {}
+    token = _request_phases.set(phases)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        _request_phases.reset(token)
+        # Label by route template, not raw path, to keep the series count bounded
+        route = request.scope.get("route")
+        REQUEST_LATENCY.observe(elapsed, request.method, getattr(route, "path", "unmatched"), str(status))
+        if SLOW_REQUEST_SECONDS and elapsed >= SLOW_REQUEST_SECONDS:
+            breakdown = ", ".join(
+                f"{phase}={seconds * 1000:.1f}ms"
+                for phase, seconds in sorted(phases.items(), key=lambda kv: -kv[1])
+            )
+            print(f"Slow request {request.method} {request.url.path} {status} "
+                  f"{elapsed * 1000:.1f}ms [{breakdown}]")
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of this worker's metrics.
+
+    Every worker keeps its own series, so with --workers > 1 a scrape only
+    sees the worker that answered it; app_worker_info carries its pid.
+    """
+    lines = [
+        "# HELP app_worker_info Worker process that served this scrape.",
+        "# TYPE app_worker_info gauge",
+        f'app_worker_info{{pid="{os.getpid()}"}} 1',
+    ]
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return Response(content="\n".join(lines) + "\n", media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # ==================== JSON Helper Functions ====================
 
+# "auto" uses orjson when it is installed, "stdlib" forces the json module
+JSON_BACKEND = os.environ.get("JSON_BACKEND", "auto")
+FAST_JSON = orjson is not None and JSON_BACKEND != "stdlib"
+STORE_JSON_PRETTY = os.environ.get("STORE_JSON_PRETTY") == "1"  # indented store files, for hand editing
+
+def dump_json(data, pretty: bool = False) -> bytes:
+    """Serialise to UTF-8 JSON bytes, compact unless pretty"""
+    if FAST_JSON:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode()
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+def parse_json(raw):
+    return orjson.loads(raw) if FAST_JSON else json.loads(raw)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response for large listings.
+
+    Endpoints return it directly with plain JSON-ready data, so FastAPI's
+    generic jsonable_encoder pass over every item is skipped.
+    """
+
+    def render(self, content) -> bytes:
+        return dump_json(content)
+
+
 def load_json(file_path: Path, default: dict) -> dict:
     """Load data from JSON file"""
-    if file_path.exists():
-        with open(file_path, 'r') as f:
-            return json.load(f)
-    return default
+    with timed("json_load"):
+        if file_path.exists():
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+            STORE_BYTES.inc(len(raw), file_path.name, "read")
+            return parse_json(raw)
+        return default
 
 def save_json(file_path: Path, data: dict):
-    """Save data to JSON file"""
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=2)
+    """Save data to JSON file atomically (temp file, fsync, rename)"""
+    tmp_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with timed("json_save"):
+            raw = dump_json(data, pretty=STORE_JSON_PRETTY)
+            with open(tmp_path, 'wb') as f:
+                f.write(raw)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+        STORE_BYTES.inc(len(raw), file_path.name, "written")
+    except BaseException:
+        if tmp_path.exists():
+            os.remove(tmp_path)
+        raise
+
+
+class StoreLock:
+    """Re-entrant lock for one store, shared by threads and by worker processes (flock)"""
+
+    def __init__(self, file_path: Path):
+        self.lock_path = file_path.with_name(f".{file_path.name}.lock")
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._handle = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                self._handle = open(self.lock_path, "a")
+                fcntl.flock(self._handle, fcntl.LOCK_EX)
+            except BaseException:
+                if self._handle:
+                    self._handle.close()
+                    self._handle = None
+                self._lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0 and self._handle is not None:
+            fcntl.flock(self._handle, fcntl.LOCK_UN)
+            self._handle.close()
+            self._handle = None
+        self._lock.release()
+
+
+_store_locks = {}
+_store_locks_guard = threading.Lock()
+
+def store_lock(file_path: Path) -> StoreLock:
+    with _store_locks_guard:
+        lock = _store_locks.get(file_path)
+        if lock is None:
+            lock = _store_locks[file_path] = StoreLock(file_path)
+        return lock
+
+
+# ==================== Worker Coordination ====================
+
+# Worker processes serving the app; set by `--workers` or gunicorn.conf.py.
+# Only used for sizing: coordination below is always on, because other
+# launchers (e.g. `uvicorn app:app --workers 2`) start several workers
+# without setting WEB_CONCURRENCY.
+WORKERS = max(1, int(os.environ.get("WEB_CONCURRENCY", 1)))
+# uvicorn --workers spawns its workers through multiprocessing
+MULTI_PROCESS = WORKERS > 1 or multiprocessing.parent_process() is not None
+STAMP_ROTATE_SIZE = 1024 * 1024  # bytes before a stamp file is replaced
+
+
+class VersionStamps:
+    """Cross-worker change stamps, one append-only file per collection.
+
+    Every committed write appends a byte to the collection's stamp file, so
+    its (inode, size) changes with each write in any worker. check_all() runs
+    a collection's invalidation callbacks when another process wrote to it;
+    writes made only by this process keep its incrementally updated caches.
+    It stays on with a single worker too (one appended byte per write, one
+    stat per collection per request), so an undeclared multi-worker launch
+    is still coherent.
+
+    Stamps are per collection, not per user: a media write in one worker
+    makes every other worker rebuild its media, search and date indexes
+    on next use, so write-heavy loads gain less from extra workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen = {}  # collection -> (inode, size) this process is in sync with
+        self._listeners = {}  # collection -> [callback]
+
+    def _path(self, collection: str) -> Path:
+        return Path(f".{collection}.stamp")
+
+    def on_change(self, collection: str, callback):
+        self._listeners.setdefault(collection, []).append(callback)
+
+    def touch(self, collection: str):
+        """Record a committed write; call after the data is visible to other processes"""
+        path = self._path(collection)
+        with self._lock:
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, b".")
+                stat = os.fstat(fd)
+            finally:
+                os.close(fd)
+            if self._seen.get(collection) == (stat.st_ino, stat.st_size - 1):
+                self._seen[collection] = (stat.st_ino, stat.st_size)
+            if stat.st_size >= STAMP_ROTATE_SIZE:
+                # A fresh file (new inode) reads as a change everywhere
+                tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+                tmp_path.write_bytes(b".")
+                os.replace(tmp_path, path)
+
+    def check_all(self):
+        for collection, callbacks in self._listeners.items():
+            try:
+                stat = os.stat(self._path(collection))
+                current = (stat.st_ino, stat.st_size)
+            except FileNotFoundError:
+                current = None
+            with self._lock:
+                if collection in self._seen and self._seen[collection] == current:
+                    continue
+                self._seen[collection] = current
+            for callback in callbacks:
+                callback()
+
+
+version_stamps = VersionStamps()
+
+
+class SharedStateMiddleware:
+    """Drop caches that another worker made stale before handling each request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            version_stamps.check_all()
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(SharedStateMiddleware)
+
+
+# ==================== Storage Backends ====================
+
+# collection name -> (JSON file, top-level key)
+COLLECTIONS = {
+    "users": (USERS_FILE, "users"),
+    "sessions": (SESSIONS_FILE, "sessions"),
+    "media": (MEDIA_FILE, "media"),
+    "timeline": (TIMELINE_FILE, "events"),
+    "notes": (NOTES_FILE, "notes"),
+    "kisses": (KISSES_FILE, "kisses"),
+    "moods": (MOODS_FILE, "moods"),
+    "blobs": (BLOBS_FILE, "blobs"),
+    "counters": (COUNTERS_FILE, "counters"),
+    "imports": (IMPORTS_FILE, "imports"),
+}
+
+# Collections persisted as {id: record} instead of a list (session tokens, blob filenames, user ids)
+KEYED_COLLECTIONS = {"sessions", "blobs", "counters"}
+
+
+class StorageBackend(ABC):
+    """Record-level interface behind the load_*/save_* helpers"""
+
+    @abstractmethod
+    def load(self, collection: str) -> dict:
+        """Return the whole collection in its legacy JSON document shape"""
+
+    @abstractmethod
+    def save(self, collection: str, data: dict):
+        """Replace the whole collection with a legacy JSON document"""
+
+    @abstractmethod
+    def transaction(self, collection: str):
+        """Context manager making a read-modify-write on a collection atomic"""
+
+    @abstractmethod
+    def find(self, collection: str, user_id: str = None) -> List[dict]:
+        pass
+
+    @abstractmethod
+    def get(self, collection: str, record_id: str, user_id: str = None) -> Optional[dict]:
+        pass
+
+    def insert(self, collection: str, record: dict):
+        self.insert_many(collection, [record])
+
+    @abstractmethod
+    def insert_many(self, collection: str, records: List[dict]):
+        pass
+
+    @abstractmethod
+    def update(self, collection: str, record_id: str, updates: dict, user_id: str = None) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    def update_many(self, collection: str, updates: dict) -> List[dict]:
+        """Apply {record_id: changes} in one write; returns the records that exist"""
+
+    @abstractmethod
+    def delete(self, collection: str, record_id: str, user_id: str = None) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    def delete_many(self, collection: str, record_ids: List[str]) -> int:
+        pass
+
+
+def _empty_document(collection: str) -> dict:
+    key = COLLECTIONS[collection][1]
+    return {key: {} if collection in KEYED_COLLECTIONS else []}
+
+
+class JSONStorage(StorageBackend):
+    """Original flat-file engine: every write rewrites the whole collection file"""
+
+    def load(self, collection: str) -> dict:
+        return load_json(COLLECTIONS[collection][0], _empty_document(collection))
+
+    def save(self, collection: str, data: dict):
+        with self.transaction(collection):
+            save_json(COLLECTIONS[collection][0], data)
+            version_stamps.touch(collection)
+
+    def transaction(self, collection: str) -> StoreLock:
+        return store_lock(COLLECTIONS[collection][0])
+
+    def _records(self, collection: str, data: dict) -> List[dict]:
+        container = data[COLLECTIONS[collection][1]]
+        if collection in KEYED_COLLECTIONS:
+            return [dict(value, id=key) for key, value in container.items()]
+        return container
+
+    def find(self, collection: str, user_id: str = None) -> List[dict]:
+        records = self._records(collection, self.load(collection))
+        if user_id is None:
+            return records
+        return [r for r in records if r.get("user_id") == user_id]
+
+    def get(self, collection: str, record_id: str, user_id: str = None) -> Optional[dict]:
+        container = self.load(collection)[COLLECTIONS[collection][1]]
+        if collection in KEYED_COLLECTIONS:
+            record = container.get(record_id)
+            record = dict(record, id=record_id) if record is not None else None
+        else:
+            record = next((r for r in container if r["id"] == record_id), None)
+        if record is None or (user_id is not None and record.get("user_id") != user_id):
+            return None
+        return record
+
+    def insert_many(self, collection: str, records: List[dict]):
+        with self.transaction(collection):
+            data = self.load(collection)
+            container = data[COLLECTIONS[collection][1]]
+            for record in records:
+                if collection in KEYED_COLLECTIONS:
+                    container[record["id"]] = {k: v for k, v in record.items() if k != "id"}
+                else:
+                    container.append(record)
+            self.save(collection, data)
+
+    def update(self, collection: str, record_id: str, updates: dict, user_id: str = None) -> Optional[dict]:
+        with self.transaction(collection):
+            data = self.load(collection)
+            container = data[COLLECTIONS[collection][1]]
+            if collection in KEYED_COLLECTIONS:
+                record = container.get(record_id)
+                if record is None or (user_id is not None and record.get("user_id") != user_id):
+                    return None
+                record.update({k: v for k, v in updates.items() if k != "id"})
+                self.save(collection, data)
+                return dict(record, id=record_id)
+            for record in container:
+                if record["id"] == record_id and (user_id is None or record.get("user_id") == user_id):
+                    record.update(updates)
+                    self.save(collection, data)
+                    return record
+            return None
+
+    def update_many(self, collection: str, updates: dict) -> List[dict]:
+        if not updates:
+            return []
+        with self.transaction(collection):
+            data = self.load(collection)
+            container = data[COLLECTIONS[collection][1]]
+            updated = []
+            if collection in KEYED_COLLECTIONS:
+                for record_id, changes in updates.items():
+                    record = container.get(record_id)
+                    if record is not None:
+                        record.update({k: v for k, v in changes.items() if k != "id"})
+                        updated.append(dict(record, id=record_id))
+            else:
+                for record in container:
+                    changes = updates.get(record["id"])
+                    if changes is not None:
+                        record.update(changes)
+                        updated.append(record)
+            if updated:
+                self.save(collection, data)
+            return updated
+
+    def delete(self, collection: str, record_id: str, user_id: str = None) -> Optional[dict]:
+        with self.transaction(collection):
+            data = self.load(collection)
+            container = data[COLLECTIONS[collection][1]]
+            if collection in KEYED_COLLECTIONS:
+                record = container.get(record_id)
+                if record is None or (user_id is not None and record.get("user_id") != user_id):
+                    return None
+                del container[record_id]
+                self.save(collection, data)
+                return dict(record, id=record_id)
+            for i, record in enumerate(container):
+                if record["id"] == record_id and (user_id is None or record.get("user_id") == user_id):
+                    container.pop(i)
+                    self.save(collection, data)
+                    return record
+            return None
+
+    def delete_many(self, collection: str, record_ids: List[str]) -> int:
+        ids = set(record_ids)
+        if not ids:
+            return 0
+        with self.transaction(collection):
+            data = self.load(collection)
+            key = COLLECTIONS[collection][1]
+            container = data[key]
+            before = len(container)
+            if collection in KEYED_COLLECTIONS:
+                data[key] = {k: v for k, v in container.items() if k not in ids}
+            else:
+                data[key] = [r for r in container if r["id"] not in ids]
+            removed = before - len(data[key])
+            if removed:
+                self.save(collection, data)
+            return removed
+
+
+class SQLiteStorage(StorageBackend):
+    """Embedded SQLite engine (WAL), one table per collection indexed by id, user_id and created_at"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        self._depth = 0
+        self._changed = set()  # collections written in the open transaction
+        self.conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        for name in COLLECTIONS:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} ("
+                "id TEXT PRIMARY KEY, user_id TEXT, created_at TEXT, data TEXT NOT NULL)"
+            )
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_user ON {name} (user_id, created_at)")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_created ON {name} (created_at)")
+
+    def _row(self, record: dict) -> tuple:
+        data = dump_json(record).decode()
+        STORE_BYTES.inc(len(data), self.db_path.name, "written")
+        return (record["id"], record.get("user_id"), record.get("created_at"), data)
+
+    @contextmanager
+    def transaction(self, collection: str = None):
+        # BEGIN IMMEDIATE takes the database write lock, so a read inside the
+        # transaction cannot be invalidated by another thread or worker
+        with self.lock:
+            outermost = self._depth == 0
+            if outermost:
+                self.conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if outermost:
+                    self._changed.clear()
+                    self.conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if outermost:
+                self.conn.execute("COMMIT")
+                # Stamp only once committed, so other workers reload the new rows
+                for changed in self._changed:
+                    version_stamps.touch(changed)
+                self._changed.clear()
+
+    def _write(self, collection: str, statements: List[tuple]):
+        with timed("sqlite_write"), self.transaction():
+            self._changed.add(collection)
+            for sql, params in statements:
+                if params and isinstance(params, list):
+                    self.conn.executemany(sql, params)
+                else:
+                    self.conn.execute(sql, params or ())
+
+    def load(self, collection: str) -> dict:
+        records = self.find(collection)
+        if collection in KEYED_COLLECTIONS:
+            container = {r["id"]: {k: v for k, v in r.items() if k != "id"} for r in records}
+        else:
+            container = records
+        return {COLLECTIONS[collection][1]: container}
+
+    def save(self, collection: str, data: dict):
+        container = data[COLLECTIONS[collection][1]]
+        if collection in KEYED_COLLECTIONS:
+            records = [dict(value, id=key) for key, value in container.items()]
+        else:
+            records = container
+        self._write(collection, [
+            (f"DELETE FROM {collection}", None),
+            (f"INSERT INTO {collection} (id, user_id, created_at, data) VALUES (?, ?, ?, ?)",
+             [self._row(r) for r in records]),
+        ])
+
+    def find(self, collection: str, user_id: str = None) -> List[dict]:
+        with timed("sqlite_read"):
+            with self.lock:
+                if user_id is None:
+                    rows = self.conn.execute(f"SELECT data FROM {collection} ORDER BY rowid").fetchall()
+                else:
+                    rows = self.conn.execute(
+                        f"SELECT data FROM {collection} WHERE user_id = ? ORDER BY rowid", (user_id,)
+                    ).fetchall()
+            STORE_BYTES.inc(sum(len(row[0]) for row in rows), self.db_path.name, "read")
+            return [parse_json(row[0]) for row in rows]
+
+    def get(self, collection: str, record_id: str, user_id: str = None) -> Optional[dict]:
+        with timed("sqlite_read"), self.lock:
+            row = self.conn.execute(f"SELECT data FROM {collection} WHERE id = ?", (record_id,)).fetchone()
+        if not row:
+            return None
+        STORE_BYTES.inc(len(row[0]), self.db_path.name, "read")
+        record = parse_json(row[0])
+        if user_id is not None and record.get("user_id") != user_id:
+            return None
+        return record
+
+    def insert_many(self, collection: str, records: List[dict]):
+        if not records:
+            return
+        self._write(collection, [
+            (f"INSERT OR REPLACE INTO {collection} (id, user_id, created_at, data) VALUES (?, ?, ?, ?)",
+             [self._row(r) for r in records]),
+        ])
+
+    def update(self, collection: str, record_id: str, updates: dict, user_id: str = None) -> Optional[dict]:
+        with self.transaction():
+            record = self.get(collection, record_id, user_id)
+            if record is None:
+                return None
+            record.update(updates)
+            record["id"] = record_id
+            self._write(collection, [
+                (f"UPDATE {collection} SET user_id = ?, created_at = ?, data = ? WHERE id = ?",
+                 (record.get("user_id"), record.get("created_at"), dump_json(record).decode(), record_id)),
+            ])
+            return record
+
+    def update_many(self, collection: str, updates: dict) -> List[dict]:
+        if not updates:
+            return []
+        with self.transaction():
+            updated = []
+            for record_id, changes in updates.items():
+                record = self.get(collection, record_id)
+                if record is not None:
+                    record.update(changes)
+                    record["id"] = record_id
+                    updated.append(record)
+            if updated:
+                self._write(collection, [
+                    (f"UPDATE {collection} SET user_id = ?, created_at = ?, data = ? WHERE id = ?",
+                     [(r.get("user_id"), r.get("created_at"), dump_json(r).decode(), r["id"]) for r in updated]),
+                ])
+            return updated
+
+    def delete(self, collection: str, record_id: str, user_id: str = None) -> Optional[dict]:
+        with self.transaction():
+            record = self.get(collection, record_id, user_id)
+            if record is None:
+                return None
+            self._write(collection, [(f"DELETE FROM {collection} WHERE id = ?", (record_id,))])
+            return record
+
+    def delete_many(self, collection: str, record_ids: List[str]) -> int:
+        if not record_ids:
+            return 0
+        with self.lock:
+            before = self.conn.total_changes
+            self._write(collection, [(f"DELETE FROM {collection} WHERE id = ?", [(rid,) for rid in record_ids])])
+            return self.conn.total_changes - before
+
+
+def migrate_json_to_sqlite(db_path: Path = SQLITE_DB_FILE) -> dict:
+    """One-shot import of the JSON files into a SQLite database"""
+    source = JSONStorage()
+    target = SQLiteStorage(db_path)
+    counts = {}
+    for collection in COLLECTIONS:
+        records = source.find(collection)
+        target.insert_many(collection, records)
+        counts[collection] = len(records)
+    return counts
+
+
+def create_storage() -> StorageBackend:
+    if STORAGE_BACKEND == "sqlite":
+        return SQLiteStorage(SQLITE_DB_FILE)
+    if STORAGE_BACKEND == "json":
+        return JSONStorage()
+    raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND}")
+
+
+storage = create_storage()
+
+
+# ==================== Compact Records ====================
+
+TIMESTAMP_EPOCH = datetime(1970, 1, 1)
+ABSENT = object()  # slot value for a field the stored record does not have
+
+def parse_timestamp(value) -> Optional[int]:
+    """Naive ISO timestamp as written by datetime.isoformat() -> microseconds since 1970"""
+    if not isinstance(value, str) or len(value) not in (19, 26) or value[10:11] != "T":
+        return None  # kept verbatim so it round-trips unchanged
+    try:
+        return (datetime.fromisoformat(value) - TIMESTAMP_EPOCH) // timedelta(microseconds=1)
+    except ValueError:
+        return None
+
+def format_timestamp(micros: int) -> str:
+    return (TIMESTAMP_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+class CompactRecord:
+    """In-memory form of a stored record for the long-lived indexes and logs.
+
+    Known fields live in slots, repeated strings (ids, categories, dates) are
+    interned and created_at is held as integer microseconds. get() and []
+    read it like the stored dict; to_dict() rebuilds that dict for the API.
+    """
+
+    __slots__ = ("id", "user_id", "created_us", "extra")
+    FIELDS = ()  # stored keys held in slots of the same name
+    INTERNED = ()  # fields whose string values are interned
+
+    def __init__(self, data: dict):
+        extra = dict(data)
+        self.id = extra.pop("id")
+        user_id = extra.pop("user_id", ABSENT)
+        self.user_id = sys.intern(user_id) if isinstance(user_id, str) else user_id
+        self.created_us = parse_timestamp(extra.get("created_at"))
+        if self.created_us is not None:
+            del extra["created_at"]
+        for field in self.FIELDS:
+            value = extra.pop(field, ABSENT)
+            if field in self.INTERNED and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, field, value)
+        self.extra = extra or None  # fields without a slot, e.g. added by newer code
+
+    @property
+    def sort_key(self) -> tuple:
+        return (self.created_us or 0, self.id)
+
+    def get(self, key: str, default=None):
+        if key == "id":
+            return self.id
+        if key == "created_at" and self.created_us is not None:
+            return format_timestamp(self.created_us)
+        if key == "user_id" or key in self.FIELDS:
+            value = getattr(self, key)
+            return default if value is ABSENT else value
+        return self.extra.get(key, default) if self.extra else default
+
+    def __getitem__(self, key: str):
+        value = self.get(key, ABSENT)
+        if value is ABSENT:
+            raise KeyError(key)
+        return value
+
+    def to_dict(self) -> dict:
+        data = {"id": self.id}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is not ABSENT:
+                data[field] = value
+        if self.created_us is not None:
+            data["created_at"] = format_timestamp(self.created_us)
+        if self.extra:
+            data.update(self.extra)
+        if self.user_id is not ABSENT:
+            data["user_id"] = self.user_id
+        return data
+
+
+class MediaRecord(CompactRecord):
+    FIELDS = ("filename", "original_name", "file_type", "category", "caption", "date_taken",
+              "is_favorite", "file_size", "content_hash", "width", "height", "orientation")
+    INTERNED = ("file_type", "category", "date_taken")
+    __slots__ = FIELDS
+
+
+class NoteRecord(CompactRecord):
+    FIELDS = ("message", "color", "author")
+    INTERNED = ("color", "author")
+    __slots__ = FIELDS
+
+
+class TimelineRecord(CompactRecord):
+    FIELDS = ("title", "description", "event_date", "image")
+    INTERNED = ("event_date",)
+    __slots__ = FIELDS
+
+
+class KissRecord(CompactRecord):
+    FIELDS = ("from", "to")
+    INTERNED = FIELDS
+    __slots__ = FIELDS
+
+
+class MoodRecord(CompactRecord):
+    FIELDS = ("mood", "message", "author", "date")
+    INTERNED = ("mood", "author", "date")
+    __slots__ = FIELDS
+
+
+RECORD_TYPES = {
+    "media": MediaRecord,
+    "notes": NoteRecord,
+    "timeline": TimelineRecord,
+    "kisses": KissRecord,
+    "moods": MoodRecord,
+}
+
+def compact_record(collection: str, data) -> CompactRecord:
+    if isinstance(data, CompactRecord):
+        return data
+    return RECORD_TYPES[collection](data)
+
+def record_dicts(records: List[CompactRecord]) -> List[dict]:
+    return [record.to_dict() for record in records]
+
+
+# ==================== Event Logs ====================
+
+EVENT_LOG_COMPACT_INTERVAL = 60  # seconds between snapshots of the append logs
+EVENT_LOG_COMPACT_THRESHOLD = 1000  # pending log entries that trigger a snapshot
+
+
+class EventLog:
+    """Append-only JSONL log in front of a high-write collection.
+
+    Writes are O(1) appends to the log; reads come from an in-memory copy
+    grouped by user. compact() periodically folds the log into the storage
+    backend (the snapshot) and starts a fresh log. With `replace_key`, a new
+    record supersedes the user's earlier record with the same key.
+    """
+
+    def __init__(self, collection: str, log_path: Path, replace_key=None):
+        self.collection = collection
+        self.log_path = log_path
+        self.replace_key = replace_key
+        self._lock = threading.RLock()
+        self._by_user = None
+        self._ids = set()  # ids of the records in _by_user
+        self._log_state = None  # (inode, bytes read) of the log file
+        self._pending = []  # records in the log, not yet in the snapshot
+        self._superseded = set()  # snapshot record ids replaced by log records
+
+    def _apply(self, data: dict, from_log: bool):
+        # A log left behind by a compaction that crashed before the swap
+        # repeats records already in the snapshot; replay them only once
+        if data["id"] in self._ids:
+            return
+        record = compact_record(self.collection, data)
+        records = self._by_user.setdefault(record.user_id, [])
+        if self.replace_key is not None:
+            key = self.replace_key(record)
+            for i, existing in enumerate(records):
+                if self.replace_key(existing) == key:
+                    records.pop(i)
+                    self._ids.discard(existing.id)
+                    if existing in self._pending:
+                        self._pending.remove(existing)
+                    else:
+                        self._superseded.add(existing.id)
+                    break
+        records.append(record)
+        self._ids.add(record.id)
+        if from_log:
+            self._pending.append(record)
+
+    def _sync(self):
+        """Load the snapshot once, then pick up log lines appended by any process"""
+        try:
+            stat = os.stat(self.log_path)
+            inode, size = stat.st_ino, stat.st_size
+        except FileNotFoundError:
+            inode, size = None, 0
+        if self._by_user is None or self._log_state is None or self._log_state[0] != inode:
+            self._by_user, self._ids, self._pending, self._superseded = {}, set(), [], set()
+            for record in storage.find(self.collection):
+                self._apply(record, from_log=False)
+            offset = 0
+        else:
+            offset = self._log_state[1]
+        if size > offset:
+            with open(self.log_path, "rb") as f:
+                f.seek(offset)
+                data = f.read(size - offset)
+            STORE_BYTES.inc(len(data), self.log_path.name, "read")
+            # Only consume complete lines; a partial line is finished by its writer
+            complete = data[:data.rfind(b"\n") + 1]
+            for line in complete.splitlines():
+                if line.strip():
+                    self._apply(parse_json(line), from_log=True)
+            offset += len(complete)
+        self._log_state = (inode, offset)
+
+    def append(self, record: dict):
+        line = dump_json(record) + b"\n"
+        with self._lock, store_lock(self.log_path):
+            self._sync()
+            with open(self.log_path, "ab") as f:
+                f.write(line)
+            STORE_BYTES.inc(len(line), self.log_path.name, "written")
+            self._sync()
+            should_compact = len(self._pending) >= EVENT_LOG_COMPACT_THRESHOLD
+        if should_compact:
+            self.compact()
+
+    def find(self, user_id: str) -> List[CompactRecord]:
+        with self._lock:
+            self._sync()
+            return list(self._by_user.get(user_id, []))
+
+    def count(self, user_id: str) -> int:
+        with self._lock:
+            self._sync()
+            return len(self._by_user.get(user_id, []))
+
+    def compact(self) -> int:
+        """Fold logged records into the snapshot and truncate the log"""
+        with self._lock, store_lock(self.log_path):
+            self._sync()
+            pending, superseded = list(self._pending), list(self._superseded)
+            if not pending and not superseded:
+                return 0
+            # Commit the snapshot before swapping the log: a crash in between
+            # only leaves log lines that _apply skips by id on the next load
+            with storage.transaction(self.collection):
+                storage.delete_many(self.collection, superseded)
+                storage.insert_many(self.collection, record_dicts(pending))
+            # A new empty log file (new inode) tells other processes to reload
+            tmp_path = self.log_path.with_name(f".{self.log_path.name}.tmp")
+            open(tmp_path, "w").close()
+            os.replace(tmp_path, self.log_path)
+            self._by_user = None
+            self._sync()
+            return len(pending)
+
+    def invalidate(self):
+        with self._lock:
+            self._by_user = None
+
+
+kiss_log = EventLog("kisses", KISSES_LOG_FILE)
+mood_log = EventLog("moods", MOODS_LOG_FILE, replace_key=lambda m: (m.get("author"), m.get("date")))
+
+def compact_event_logs():
+    for log in (kiss_log, mood_log):
+        try:
+            log.compact()
+        except Exception as e:
+            print(f"Failed to compact {log.collection} log: {e}")
+
+async def event_log_compact_loop():
+    while True:
+        await asyncio.sleep(EVENT_LOG_COMPACT_INTERVAL)
+        compact_event_logs()
+
+
+# ==================== Counters ====================
+
+COUNTER_FIELDS = ("images", "videos", "favorites", "notes", "timeline")
+COUNTERS_RECONCILE_INTERVAL = 6 * 60 * 60  # seconds between drift checks of the counter rows
+
+def compute_counters(user_id: str) -> dict:
+    """Count a user's records from scratch; seeds and reconciles the counters row"""
+    media = storage.find("media", user_id)
+    return {
+        "id": user_id,
+        "user_id": user_id,
+        "images": sum(1 for m in media if m.get("file_type") == "image"),
+        "videos": sum(1 for m in media if m.get("file_type") == "video"),
+        "favorites": sum(1 for m in media if m.get("is_favorite")),
+        "notes": len(storage.find("notes", user_id)),
+        "timeline": len(storage.find("timeline", user_id)),
+    }
+
+_counters_cache = {}  # user_id -> counters row, dropped after every counters write
+_counters_cache_lock = threading.Lock()
+_counters_generation = 0  # bumped after writes so a read that raced one is not cached
+
+def invalidate_counters(user_id: str = None):
+    global _counters_generation
+    with _counters_cache_lock:
+        _counters_generation += 1
+        if user_id is None:
+            _counters_cache.clear()
+        else:
+            _counters_cache.pop(user_id, None)
+
+def get_counters(user_id: str) -> dict:
+    # Kisses are counted off the in-memory log itself, so logging a kiss
+    # has no second write that could fail or be lost
+    with _counters_cache_lock:
+        cached = _counters_cache.get(user_id)
+        generation = _counters_generation
+    if cached is not None:
+        return dict(cached, kisses=kiss_log.count(user_id))
+    counters = storage.get("counters", user_id)
+    if counters is None:
+        with storage.transaction("counters"):
+            counters = storage.get("counters", user_id)
+            if counters is None:
+                counters = compute_counters(user_id)
+                storage.insert("counters", counters)
+    with _counters_cache_lock:
+        if generation == _counters_generation:
+            _counters_cache[user_id] = dict(counters)
+    return dict(counters, kisses=kiss_log.count(user_id))
+
+def bump_counters(user_id: str, **deltas):
+    """Apply deltas after the matching record write, inside the caller's transaction"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    try:
+        with storage.transaction("counters"):
+            counters = storage.get("counters", user_id)
+            if counters is None:
+                # Seeding counts the write that was just made
+                storage.insert("counters", compute_counters(user_id))
+                return
+            storage.update("counters", user_id, {
+                field: max(0, counters.get(field, 0) + delta) for field, delta in deltas.items()
+            })
+    finally:
+        invalidate_counters(user_id)
+
+def reset_counters():
+    """Forget all counters after a whole-collection rewrite; they are re-seeded on demand"""
+    storage.save("counters", _empty_document("counters"))
+    invalidate_counters()
+
+def reconcile_counters() -> int:
+    """Re-seed counter rows that drifted from the records they count.
+
+    On the JSON backend a record write and its counter bump are two file
+    rewrites, so a crash between them leaves the row off until fixed here.
+    Returns the number of rows corrected.
+    """
+    fixed = 0
+    for row in storage.find("counters"):
+        user_id = row["id"]
+        # Same order as the write paths (record collection, then counters),
+        # so no bump can land between the recount and the comparison
+        with storage.transaction("media"), storage.transaction("notes"), \
+                storage.transaction("timeline"), storage.transaction("counters"):
+            actual = compute_counters(user_id)
+            current = storage.get("counters", user_id)
+            if current is None or all(current.get(f) == actual[f] for f in COUNTER_FIELDS):
+                continue
+            storage.update("counters", user_id, {f: actual[f] for f in COUNTER_FIELDS})
+        invalidate_counters(user_id)
+        fixed += 1
+    if fixed:
+        print(f"Reconciled {fixed} drifted counter rows")
+    return fixed
+
+async def counters_reconcile_loop():
+    while True:
+        try:
+            await asyncio.to_thread(reconcile_counters)
+        except Exception as e:
+            print(f"Failed to reconcile counters: {e}")
+        await asyncio.sleep(COUNTERS_RECONCILE_INTERVAL)
+
+version_stamps.on_change("counters", invalidate_counters)
+
+
+# ==================== Session Cache ====================
+
+SESSION_MAX_AGE = 7 * 24 * 60 * 60  # seconds, matches the session cookie
+SESSION_SWEEP_INTERVAL = 60 * 60  # seconds between expired-session sweeps
+MAX_SESSIONS_PER_USER = 10
+SESSION_CACHE_TTL = 300  # seconds a cached session/user stays valid
+SESSION_CACHE_SIZE = 10000
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a fixed time-to-live"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+session_cache = TTLCache(SESSION_CACHE_SIZE, SESSION_CACHE_TTL)  # token -> session
+version_stamps.on_change("sessions", session_cache.clear)  # logouts and evictions in other workers
+
+def is_session_expired(session: dict) -> bool:
+    try:
+        created_at = datetime.fromisoformat(session["created_at"])
+    except (KeyError, TypeError, ValueError):
+        return True
+    return datetime.now() - created_at > timedelta(seconds=SESSION_MAX_AGE)
+
+def prune_expired_sessions() -> int:
+    """Delete every expired session in one bulk write"""
+    expired = [s["id"] for s in storage.find("sessions") if is_session_expired(s)]
+    for token in expired:
+        session_cache.pop(token)
+    return storage.delete_many("sessions", expired)
+
+async def session_sweep_loop():
+    while True:
+        try:
+            removed = prune_expired_sessions()
+            if removed:
+                print(f"Pruned {removed} expired sessions")
+        except Exception as e:
+            print(f"Failed to prune sessions: {e}")
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
 
 
 # ==================== User Management ====================
 
+class UserIndex:
+    """In-memory hash indexes over the users store: id, case-folded username and email"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_id = None
+        self._by_username = {}
+        self._by_email = {}
+
+    def invalidate(self):
+        with self._lock:
+            self._by_id = None
+
+    def _ensure(self):
+        if self._by_id is None:
+            self._by_id, self._by_username, self._by_email = {}, {}, {}
+            for user in storage.find("users"):
+                self._add(user)
+
+    def _add(self, user: dict):
+        self._by_id[user["id"]] = user
+        self._by_username[user["username"].casefold()] = user
+        self._by_email[user["email"].casefold()] = user
+
+    def add(self, user: dict):
+        with self._lock:
+            self._ensure()
+            old = self._by_id.get(user["id"])
+            if old is not None:
+                self._by_username.pop(old["username"].casefold(), None)
+                self._by_email.pop(old["email"].casefold(), None)
+            self._add(user)
+
+    def get(self, user_id: str) -> Optional[dict]:
+        with self._lock:
+            self._ensure()
+            return self._by_id.get(user_id)
+
+    def get_by_username(self, username: str) -> Optional[dict]:
+        with self._lock:
+            self._ensure()
+            return self._by_username.get(username.casefold())
+
+    def get_by_email(self, email: str) -> Optional[dict]:
+        with self._lock:
+            self._ensure()
+            return self._by_email.get(email.casefold())
+
+
+users_index = UserIndex()
+version_stamps.on_change("users", users_index.invalidate)
+
 def load_users() -> dict:
-    return load_json(USERS_FILE, {"users": []})
+    return storage.load("users")
 
 def save_users(data: dict):
-    save_json(USERS_FILE, data)
+    storage.save("users", data)
+    users_index.invalidate()
 
 def load_sessions() -> dict:
-    return load_json(SESSIONS_FILE, {"sessions": {}})
+    return storage.load("sessions")
 
 def save_sessions(data: dict):
-    save_json(SESSIONS_FILE, data)
+    storage.save("sessions", data)
 
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
 def get_user_by_username(username: str) -> Optional[dict]:
-    data = load_users()
-    for user in data["users"]:
-        if user["username"].lower() == username.lower():
-            return user
-    return None
+    return users_index.get_by_username(username)
+
+def get_user_by_email(email: str) -> Optional[dict]:
+    return users_index.get_by_email(email)
+
+def add_user(user: dict):
+    storage.insert("users", user)
+    users_index.add(user)
+
+def update_user(user_id: str, updates: dict) -> Optional[dict]:
+    updated = storage.update("users", user_id, updates)
+    if updated is not None:
+        users_index.add(updated)
+    return updated
+
+def enforce_session_limit(user_id: str):
+    """Drop the oldest sessions so a new one keeps the user within MAX_SESSIONS_PER_USER"""
+    sessions = storage.find("sessions", user_id)
+    excess = len(sessions) - MAX_SESSIONS_PER_USER + 1
+    if excess <= 0:
+        return
+    sessions.sort(key=lambda x: x.get("created_at", ""))
+    for session in sessions[:excess]:
+        delete_session(session["id"])
 
 def create_session(user_id: str) -> str:
+    enforce_session_limit(user_id)
     token = secrets.token_hex(32)
-    sessions = load_sessions()
-    sessions["sessions"][token] = {
+    session = {
+        "id": token,
         "user_id": user_id,
         "created_at": datetime.now().isoformat()
     }
-    save_sessions(sessions)
+    # Written through: the next request may land on another worker, which
+    # must find it in storage (logins are rare next to session reads)
+    storage.insert("sessions", session)
+    session_cache.set(token, session)
     return token
 
+def get_session(token: str) -> Optional[dict]:
+    session = session_cache.get(token)
+    if session is None:
+        session = storage.get("sessions", token)
+        if session is not None:
+            session_cache.set(token, session)
+    if session is not None and is_session_expired(session):
+        delete_session(token)
+        return None
+    return session
+
 def get_session_user(token: str) -> Optional[dict]:
     if not token:
         return None
-    sessions = load_sessions()
-    session = sessions["sessions"].get(token)
+    session = get_session(token)
     if session:
-        data = load_users()
-        for user in data["users"]:
-            if user["id"] == session["user_id"]:
-                return user
+        return users_index.get(session["user_id"])
     return None
 
 def delete_session(token: str):
-    sessions = load_sessions()
-    if token in sessions["sessions"]:
-        del sessions["sessions"][token]
-        save_sessions(sessions)
+    session_cache.pop(token)
+    storage.delete("sessions", token)
 
 def get_current_user(request: Request) -> Optional[dict]:
-    token = request.cookies.get("session_token")
-    return get_session_user(token)
+    with timed("auth"):
+        token = request.cookies.get("session_token")
+        return get_session_user(token)
 
 
 # ==================== Media Management ====================
 
 def load_media() -> dict:
-    return load_json(MEDIA_FILE, {"media": []})
-
-# Timeline file
-TIMELINE_FILE = Path("timeline.json")
+    return storage.load("media")
 
 def load_timeline() -> dict:
-    return load_json(TIMELINE_FILE, {"events": []})
+    return storage.load("timeline")
 
 def save_timeline(data: dict):
-    save_json(TIMELINE_FILE, data)
+    storage.save("timeline", data)
+    search_index.invalidate()
+    date_index.invalidate("timeline")
+    reset_counters()
 
 def save_media(data: dict):
-    save_json(MEDIA_FILE, data)
+    storage.save("media", data)
+    media_index.invalidate()
+    search_index.invalidate()
+    date_index.invalidate("media")
+    reset_counters()
+
+def media_url(item: dict) -> str:
+    if item["file_type"] == "image":
+        return f"/uploads/images/{item['filename']}"
+    return f"/uploads/videos/{item['filename']}"
+
+def media_view(item: MediaRecord) -> dict:
+    """Media record as returned by the API, with its public URLs"""
+    view = item.to_dict()
+    view["url"] = media_url(item)
+    if item["file_type"] == "image":
+        view["thumbnails"] = thumbnail_urls(item["filename"])
+    return view
+
+
+class UserMedia:
+    """One user's media in created_at order, bucketed by type, category and both"""
+
+    def __init__(self, items: List[dict]):
+        self.items = {}
+        self.buckets = {}
+        for item in items:
+            self.add(compact_record("media", item))
+
+    def _bucket_keys(self, item: MediaRecord) -> List[tuple]:
+        file_type, category = item.get("file_type"), item.get("category")
+        return [(None, None), (file_type, None), (None, category), (file_type, category)]
+
+    def add(self, item: MediaRecord):
+        self.items[item.id] = item
+        key = item.sort_key
+        for bucket_key in self._bucket_keys(item):
+            bisect.insort(self.buckets.setdefault(bucket_key, []), key)
+
+    def remove(self, media_id: str) -> Optional[dict]:
+        item = self.items.pop(media_id, None)
+        if item is None:
+            return None
+        key = item.sort_key
+        for bucket_key in self._bucket_keys(item):
+            bucket = self.buckets[bucket_key]
+            i = bisect.bisect_left(bucket, key)
+            if i < len(bucket) and bucket[i] == key:
+                bucket.pop(i)
+            if not bucket:
+                del self.buckets[bucket_key]
+        return item
+
+    def listing(self, file_type: str = None, category: str = None) -> List[MediaRecord]:
+        """Newest first; cost is proportional to the size of the result"""
+        bucket = self.buckets.get((file_type or None, category or None), [])
+        return [self.items[media_id] for _, media_id in reversed(bucket)]
+
+    def page(self, file_type: str = None, category: str = None,
+             limit: int = 50, after: tuple = None) -> tuple:
+        """Up to `limit` items older than the `after` sort key, newest first.
+
+        Returns (items, next sort key or None, bucket size).
+        """
+        bucket = self.buckets.get((file_type or None, category or None), [])
+        end = bisect.bisect_left(bucket, after) if after else len(bucket)
+        start = max(0, end - limit)
+        keys = bucket[start:end]
+        items = [self.items[media_id] for _, media_id in reversed(keys)]
+        next_key = keys[0] if start > 0 else None
+        return items, next_key, len(bucket)
+
+
+class MediaIndex:
+    """Per-user media listings, loaded lazily and maintained incrementally on writes"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._users = {}
+
+    def invalidate(self):
+        with self._lock:
+            self._users.clear()
+
+    def _user(self, user_id: str) -> UserMedia:
+        user_media = self._users.get(user_id)
+        if user_media is None:
+            user_media = self._users[user_id] = UserMedia(storage.find("media", user_id))
+        return user_media
+
+    def listing(self, user_id: str, file_type: str = None, category: str = None) -> List[MediaRecord]:
+        with self._lock:
+            return self._user(user_id).listing(file_type, category)
+
+    def page(self, user_id: str, file_type: str = None, category: str = None,
+             limit: int = 50, after: tuple = None) -> tuple:
+        with self._lock:
+            return self._user(user_id).page(file_type, category, limit, after)
+
+    def get(self, user_id: str, media_id: str) -> Optional[MediaRecord]:
+        with self._lock:
+            return self._user(user_id).items.get(media_id)
+
+    def add(self, item: MediaRecord):
+        with self._lock:
+            if item.user_id in self._users:
+                self._users[item.user_id].add(item)
+
+    def remove(self, user_id: str, media_id: str):
+        with self._lock:
+            if user_id in self._users:
+                self._users[user_id].remove(media_id)
+
+
+media_index = MediaIndex()
+version_stamps.on_change("media", media_index.invalidate)
 
 def get_user_media(user_id: str, file_type: str = None, category: str = None) -> List[dict]:
-    data = load_media()
-    media_list = []
-    for item in data["media"]:
-        if item.get("user_id") == user_id:
-            if file_type and item.get("file_type") != file_type:
-                continue
-            if category and item.get("category") != category:
-                continue
-            # Add URL
-            if item["file_type"] == "image":
-                item["url"] = f"/uploads/images/{item['filename']}"
-            else:
-                item["url"] = f"/uploads/videos/{item['filename']}"
-            media_list.append(item)
-    return sorted(media_list, key=lambda x: x.get("created_at", ""), reverse=True)
+    with timed("media_listing"):
+        return [media_view(item) for item in media_index.listing(user_id, file_type, category)]
+
+MAX_MEDIA_PAGE_SIZE = 500
+
+def encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created, media_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if isinstance(created, str):
+            # Cursors issued before created_at was held numerically
+            created = parse_timestamp(created) or 0
+        return (int(created), str(media_id))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def project_fields(item: dict, fields: Optional[str]) -> dict:
+    if not fields:
+        return item
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    return {f: item[f] for f in wanted if f in item}
+
+def media_listing(user_id: str, file_type: str = None, category: str = None,
+                  limit: int = None, after: str = None, fields: str = None) -> dict:
+    """Response body for the media listing endpoints.
+
+    Without `limit` the full list is returned as before; with it the listing is
+    paginated newest first and `next_cursor` is passed back as `after`.
+    """
+    if limit is None and after is None:
+        media_list = get_user_media(user_id, file_type, category)
+        return {"media": [project_fields(item, fields) for item in media_list], "total": len(media_list)}
+
+    items, next_key, total = media_index.page(
+        user_id, file_type, category,
+        limit or MAX_MEDIA_PAGE_SIZE,
+        decode_cursor(after) if after else None
+    )
+    return {
+        "media": [project_fields(media_view(item), fields) for item in items],
+        "total": total,
+        "next_cursor": encode_cursor(next_key) if next_key else None
+    }
 
 def get_media_by_id(media_id: str, user_id: str) -> Optional[dict]:
-    data = load_media()
-    for item in data["media"]:
-        if item["id"] == media_id and item.get("user_id") == user_id:
-            if item["file_type"] == "image":
-                item["url"] = f"/uploads/images/{item['filename']}"
-            else:
-                item["url"] = f"/uploads/videos/{item['filename']}"
-            return item
+    item = media_index.get(user_id, media_id)
+    if item:
+        return media_view(item)
     return None
 
+def acquire_blobs(filenames: List[str]):
+    """Add one reference per filename to the content-addressed blob records"""
+    counts = {}
+    for filename in filenames:
+        counts[filename] = counts.get(filename, 0) + 1
+    new_blobs = []
+    with storage.transaction("blobs"):
+        for filename, count in counts.items():
+            blob = storage.get("blobs", filename)
+            if blob:
+                storage.update("blobs", filename, {"refs": blob["refs"] + count})
+            else:
+                new_blobs.append({"id": filename, "refs": count, "created_at": datetime.now().isoformat()})
+        storage.insert_many("blobs", new_blobs)
+
+def release_blob(filename: str) -> bool:
+    """Drop one reference; True when it was the last one and the file can be unlinked"""
+    with storage.transaction("blobs"):
+        blob = storage.get("blobs", filename)
+        if blob is None:
+            # Files stored before deduplication have a single owner
+            return True
+        if blob["refs"] <= 1:
+            storage.delete("blobs", filename)
+            return True
+        storage.update("blobs", filename, {"refs": blob["refs"] - 1})
+        return False
+
+def commit_blob(staging_path: Path, save_path: Path) -> bool:
+    """Move a staged copy into place (or drop it as a duplicate) and take its reference.
+
+    Both happen inside the blob transaction, so a concurrent delete of the
+    last reference cannot unlink the file in between. True when the staged
+    copy became the blob.
+    """
+    with storage.transaction("blobs"):
+        created = not save_path.exists()
+        if created:
+            os.replace(staging_path, save_path)
+        else:
+            os.remove(staging_path)
+        acquire_blobs([save_path.name])
+    return created
+
+def discard_blob(item: dict):
+    """Drop a media item's blob reference, unlinking the file if it was the last one"""
+    with storage.transaction("blobs"):
+        if not release_blob(item["filename"]):
+            return
+        file_path = media_path(item)
+        if file_path.exists():
+            os.remove(file_path)
+    if item["file_type"] == "image":
+        delete_thumbnails(item["filename"])
+
+def media_type_deltas(media_items: List[dict], sign: int = 1) -> dict:
+    deltas = {"images": 0, "videos": 0, "favorites": 0}
+    for item in media_items:
+        deltas["images" if item["file_type"] == "image" else "videos"] += sign
+        if item.get("is_favorite"):
+            deltas["favorites"] += sign
+    return deltas
+
+def index_media(item: dict):
+    record = compact_record("media", item)
+    media_index.add(record)
+    search_index.add("media", record)
+    date_index.add("media", record)
+
 def add_media(media_item: dict):
-    data = load_media()
-    data["media"].append(media_item)
-    save_media(data)
+    # The blob reference was taken when the file was stored (commit_blob)
+    with storage.transaction("media"):
+        storage.insert("media", media_item)
+        bump_counters(media_item["user_id"], **media_type_deltas([media_item]))
+    index_media(media_item)
+
+def add_media_many(media_items: List[dict]):
+    """Commit a batch of media records in a single storage write"""
+    if not media_items:
+        return
+    by_user = {}
+    for item in media_items:
+        by_user.setdefault(item["user_id"], []).append(item)
+    with storage.transaction("media"):
+        storage.insert_many("media", media_items)
+        for user_id, items in by_user.items():
+            bump_counters(user_id, **media_type_deltas(items))
+    for item in media_items:
+        index_media(item)
 
 def update_media(media_id: str, user_id: str, updates: dict) -> bool:
-    data = load_media()
-    for item in data["media"]:
-        if item["id"] == media_id and item.get("user_id") == user_id:
-            item.update(updates)
-            save_media(data)
-            return True
-    return False
+    updated = storage.update("media", media_id, updates, user_id)
+    if updated is None:
+        return False
+    media_index.remove(user_id, media_id)
+    index_media(updated)
+    return True
+
+def update_media_many(updates: dict) -> int:
+    """Apply {media_id: changes} for a batch in a single storage write"""
+    updated = storage.update_many("media", updates)
+    for record in updated:
+        media_index.remove(record["user_id"], record["id"])
+        index_media(record)
+    return len(updated)
+
+def toggle_media_favorite(media_id: str, user_id: str) -> Optional[bool]:
+    with storage.transaction("media"):
+        item = storage.get("media", media_id, user_id)
+        if item is None:
+            return None
+        new_value = not item.get("is_favorite", False)
+        update_media(media_id, user_id, {"is_favorite": new_value})
+        bump_counters(user_id, favorites=1 if new_value else -1)
+        return new_value
 
 def delete_media_item(media_id: str, user_id: str) -> Optional[dict]:
-    data = load_media()
-    for i, item in enumerate(data["media"]):
-        if item["id"] == media_id and item.get("user_id") == user_id:
-            deleted = data["media"].pop(i)
-            save_media(data)
-            return deleted
-    return None
+    with storage.transaction("media"):
+        deleted = storage.delete("media", media_id, user_id)
+        if deleted:
+            bump_counters(user_id, **media_type_deltas([deleted], sign=-1))
+    if deleted:
+        media_index.remove(user_id, media_id)
+        search_index.remove("media", user_id, media_id)
+        date_index.remove("media", user_id, media_id)
+    return deleted
+
+def media_path(item: dict) -> Path:
+    if item["file_type"] == "image":
+        return UPLOAD_DIR / "images" / item["filename"]
+    return UPLOAD_DIR / "videos" / item["filename"]
 
 def get_file_extension(filename: str) -> str:
     return Path(filename).suffix.lower()
@@ -190,6 +1743,940 @@ def get_file_type(filename: str) -> str:
     return "unknown"
 
 
+# ==================== Upload Pipeline ====================
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+MAX_UPLOAD_FILE_SIZE = int(os.environ.get("MAX_UPLOAD_FILE_SIZE", 2 * 1024 ** 3))  # 2 GB
+MAX_UPLOAD_REQUEST_SIZE = int(os.environ.get("MAX_UPLOAD_REQUEST_SIZE", 4 * 1024 ** 3))  # 4 GB
+UPLOAD_CONCURRENCY = 4  # files of one batch stored in parallel
+
+
+class UploadBudget:
+    """Bytes still allowed for the rest of one request's files"""
+
+    def __init__(self, limit: int = MAX_UPLOAD_REQUEST_SIZE):
+        self.remaining = limit
+
+    def consume(self, size: int):
+        self.remaining -= size
+        if self.remaining < 0:
+            raise HTTPException(status_code=413, detail="Upload too large")
+
+
+async def store_upload(upload: UploadFile, save_path: Path, budget: UploadBudget = None,
+                       max_size: int = MAX_UPLOAD_FILE_SIZE) -> tuple:
+    """Stream an upload to save_path in chunks without blocking the event loop.
+
+    Data goes to a temporary file that is renamed into place once complete.
+    Returns (file_size, sha256 hex digest).
+    """
+    tmp_path = save_path.with_name(f".{save_path.name}.{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    file_size = 0
+    start = time.perf_counter()
+    try:
+        with timed("upload_copy"):
+            async with aiofiles.open(tmp_path, "wb") as buffer:
+                while True:
+                    chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    file_size += len(chunk)
+                    if file_size > max_size:
+                        raise HTTPException(status_code=413, detail="File too large")
+                    if budget:
+                        budget.consume(len(chunk))
+                    digest.update(chunk)
+                    await buffer.write(chunk)
+        os.replace(tmp_path, save_path)
+    except BaseException:
+        if tmp_path.exists():
+            os.remove(tmp_path)
+        raise
+    finally:
+        await upload.close()
+    record_upload("upload", file_size, time.perf_counter() - start)
+    return file_size, digest.hexdigest()
+
+
+async def store_blob(upload: UploadFile, directory: Path, ext: str, budget: UploadBudget = None) -> tuple:
+    """Store an upload under its content hash, reusing the blob if it already exists.
+
+    Returns (filename, file_size, content_hash, created).
+    """
+    staging_path = directory / f".{uuid.uuid4().hex}{ext}.staging"
+    file_size, content_hash = await store_upload(upload, staging_path, budget)
+    filename = f"{content_hash}{ext}"
+    try:
+        created = commit_blob(staging_path, directory / filename)
+    except BaseException:
+        if staging_path.exists():
+            os.remove(staging_path)
+        raise
+    return filename, file_size, content_hash, created
+
+
+class UploadLimitMiddleware:
+    """Reject POST bodies over MAX_UPLOAD_REQUEST_SIZE before the multipart parser spools them.
+
+    A declared Content-Length is checked up front; bodies without one
+    (chunked) are counted as they arrive and aborted once over the limit.
+    """
+
+    def __init__(self, app, limit: int = MAX_UPLOAD_REQUEST_SIZE):
+        self.app = app
+        self.limit = limit
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.limit:
+                response = JSONResponse(status_code=413, content={"detail": "Upload too large"})
+                return await response(scope, receive, send)
+
+        received = 0
+        exceeded = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    exceeded = True
+                    raise HTTPException(status_code=413, detail="Upload too large")
+            return message
+
+        async def limited_send(message):
+            # Body parsing wraps the error into a generic 400; answer 413 instead
+            if not exceeded:
+                await send(message)
+            elif message["type"] == "http.response.start":
+                response = JSONResponse(status_code=413, content={"detail": "Upload too large"})
+                await response(scope, receive, send)
+
+        await self.app(scope, limited_receive, limited_send)
+
+
+app.add_middleware(UploadLimitMiddleware)
+
+
+# ==================== Thumbnails ====================
+
+try:
+    from PIL import Image, ImageOps, features as pil_features
+except ImportError:
+    Image = None
+
+THUMBNAIL_DIR = UPLOAD_DIR / "thumbnails"
+THUMBNAIL_WIDTHS = (320, 640, 1280)
+THUMBNAIL_FORMAT = "webp" if Image and pil_features.check("webp") else "jpeg"
+PROCESS_POOL_WORKERS = int(os.environ.get(
+    "PROCESS_POOL_WORKERS", max(1, min(4, (os.cpu_count() or 1) // WORKERS))
+))
+
+_process_pool = None
+_thumbnail_jobs = {}  # target path -> in-flight render future
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=PROCESS_POOL_WORKERS)
+    return _process_pool
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+_background_tasks = set()
+
+def run_in_background(coro) -> asyncio.Task:
+    """Start a fire-and-forget task, keeping a reference until it finishes"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+def thumbnail_name(filename: str) -> str:
+    return f"{filename}.{THUMBNAIL_FORMAT}"
+
+def thumbnail_urls(filename: str) -> dict:
+    return {str(width): f"/thumbnails/{width}/{thumbnail_name(filename)}" for width in THUMBNAIL_WIDTHS}
+
+def delete_thumbnails(filename: str):
+    for width in THUMBNAIL_WIDTHS:
+        path = THUMBNAIL_DIR / str(width) / thumbnail_name(filename)
+        if path.exists():
+            os.remove(path)
+
+def render_thumbnail(source: str, target: str, width: int, image_format: str):
+    """Resize an image to at most `width` pixels wide; runs in a worker process"""
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((width, width * 10))
+        if image_format == "jpeg" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        tmp_path = f"{target}.{os.getpid()}.part"
+        img.save(tmp_path, image_format.upper(), quality=80)
+        os.replace(tmp_path, target)
+
+async def ensure_thumbnail(filename: str, width: int) -> Path:
+    """Render a derivative on first request and reuse the cached file afterwards"""
+    target = THUMBNAIL_DIR / str(width) / thumbnail_name(filename)
+    if target.exists():
+        return target
+    job = _thumbnail_jobs.get(target)
+    if job is None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        source = UPLOAD_DIR / "images" / filename
+        loop = asyncio.get_running_loop()
+        job = loop.run_in_executor(get_process_pool(), render_thumbnail,
+                                   str(source), str(target), width, THUMBNAIL_FORMAT)
+        _thumbnail_jobs[target] = job
+        job.add_done_callback(lambda _: _thumbnail_jobs.pop(target, None))
+    await asyncio.shield(job)
+    return target
+
+@app.get("/thumbnails/{width}/{name}")
+async def get_thumbnail(width: int, name: str):
+    if width not in THUMBNAIL_WIDTHS or not name.endswith(f".{THUMBNAIL_FORMAT}"):
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    filename = name[:-len(THUMBNAIL_FORMAT) - 1]
+    source = UPLOAD_DIR / "images" / filename
+    if Path(filename).name != filename or not source.is_file():
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+
+    if Image is None:
+        return FileResponse(source)
+    try:
+        path = await ensure_thumbnail(filename, width)
+    except Exception as e:
+        print(f"Failed to render thumbnail for {filename}: {e}")
+        return FileResponse(source)
+    return FileResponse(
+        path,
+        media_type=f"image/{THUMBNAIL_FORMAT}",
+        headers={"Cache-Control": "public, max-age=31536000"}
+    )
+
+
+# ==================== Image Metadata ====================
+
+EXIF_ORIENTATION = 0x0112
+EXIF_DATETIME = 0x0132
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 0x9003
+
+def read_image_metadata(path: str) -> dict:
+    """Dimensions, orientation and EXIF capture date of an image; runs in a worker process"""
+    with Image.open(path) as img:
+        exif = img.getexif()
+        width, height = img.size
+        orientation = exif.get(EXIF_ORIENTATION, 1)
+        taken = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+    if orientation in (5, 6, 7, 8):
+        # Rotated 90 degrees when displayed
+        width, height = height, width
+    date_taken = None
+    if isinstance(taken, str):
+        try:
+            date_taken = datetime.strptime(taken.strip("\x00 "), "%Y:%m:%d %H:%M:%S").strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    return {"width": width, "height": height, "orientation": orientation, "date_taken": date_taken}
+
+async def extract_media_metadata(media_items: List[dict], use_exif_date: bool):
+    """Read image metadata off the request path and store a batch's in one write"""
+    try:
+        loop = asyncio.get_running_loop()
+        pool = get_process_pool()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, read_image_metadata, str(media_path(item))) for item in media_items
+        ), return_exceptions=True)
+    except Exception as e:
+        print(f"Failed to read metadata for {len(media_items)} images: {e}")
+        return
+    updates = {}
+    for item, metadata in zip(media_items, results):
+        if isinstance(metadata, Exception):
+            print(f"Failed to read metadata for {item['filename']}: {metadata}")
+            continue
+        changes = {key: metadata[key] for key in ("width", "height", "orientation")}
+        if use_exif_date and metadata["date_taken"]:
+            changes["date_taken"] = metadata["date_taken"]
+        updates[item["id"]] = changes
+    update_media_many(updates)
+
+def schedule_metadata_extraction(media_items: List[dict], use_exif_date: bool = True):
+    if Image is None:
+        return
+    images = [item for item in media_items if item["file_type"] == "image"]
+    if images:
+        run_in_background(extract_media_metadata(images, use_exif_date))
+
+
+# ==================== Media Serving ====================
+
+# Files in these upload folders are never rewritten in place (profiles are)
+IMMUTABLE_UPLOAD_DIRS = {"images", "videos", "timeline"}
+
+def is_content_addressed(filename: str) -> bool:
+    stem = Path(filename).stem
+    return len(stem) == 64 and all(ch in "0123456789abcdef" for ch in stem)
+
+@app.api_route("/uploads/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_upload(request: Request, file_path: str):
+    """Serve uploads with byte-range support, strong ETags and long-lived caching"""
+    base = UPLOAD_DIR.resolve()
+    path = (UPLOAD_DIR / file_path).resolve()
+    if base not in path.parents or not path.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+
+    headers = {}
+    if is_content_addressed(path.name):
+        headers["ETag"] = f'"{Path(path.name).stem}"'
+    if path.parent.parent == base and path.parent.name in IMMUTABLE_UPLOAD_DIRS:
+        headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        headers["Cache-Control"] = "no-cache"
+
+    # FileResponse handles Range/If-Range (206) and hands whole files to the
+    # server via http.response.pathsend for zero-copy sendfile where supported
+    response = FileResponse(path, headers=headers, stat_result=os.stat(path))
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        etag = response.headers["etag"]
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers={
+                "ETag": etag,
+                "Cache-Control": response.headers["cache-control"]
+            })
+    return response
+
+
+# ==================== Search ====================
+
+SEARCH_TOKEN_RE = re.compile(r"\w+")
+SEARCH_K1 = 1.2  # BM25 term-frequency saturation
+SEARCH_B = 0.75  # BM25 length normalisation
+MAX_SEARCH_PAGE_SIZE = 100
+
+# Searchable text per content type
+SEARCH_FIELDS = {
+    "media": ("caption",),
+    "note": ("message",),
+    "timeline": ("title", "description"),
+}
+SEARCH_COLLECTIONS = {"media": "media", "note": "notes", "timeline": "timeline"}
+
+def tokenize(text: str) -> List[str]:
+    return SEARCH_TOKEN_RE.findall(text.casefold())
+
+
+class UserSearchIndex:
+    """Inverted index over one user's captions, notes and timeline events"""
+
+    def __init__(self):
+        self.postings = {}  # term -> {doc key: term frequency}
+        self.docs = {}  # doc key -> (record, length)
+        self.total_length = 0
+
+    def add(self, kind: str, record: CompactRecord):
+        key = (kind, record.id)
+        self.remove(kind, record.id)
+        text = " ".join(record.get(field) or "" for field in SEARCH_FIELDS[kind])
+        terms = tokenize(text)
+        self.docs[key] = (record, len(terms))
+        self.total_length += len(terms)
+        for term in terms:
+            postings = self.postings.setdefault(term, {})
+            postings[key] = postings.get(key, 0) + 1
+
+    def remove(self, kind: str, record_id: str):
+        key = (kind, record_id)
+        doc = self.docs.pop(key, None)
+        if doc is None:
+            return
+        record, length = doc
+        self.total_length -= length
+        text = " ".join(record.get(field) or "" for field in SEARCH_FIELDS[kind])
+        for term in set(tokenize(text)):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self.postings[term]
+
+    def search(self, query: str, kinds: set = None) -> List[tuple]:
+        """BM25-ranked (score, kind, record) hits, best first"""
+        doc_count = len(self.docs)
+        if not doc_count:
+            return []
+        avg_length = self.total_length / doc_count or 1
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for key, tf in postings.items():
+                if kinds and key[0] not in kinds:
+                    continue
+                length = self.docs[key][1]
+                norm = tf * (SEARCH_K1 + 1) / (tf + SEARCH_K1 * (1 - SEARCH_B + SEARCH_B * length / avg_length))
+                scores[key] = scores.get(key, 0) + idf * norm
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        return [(score, key[0], self.docs[key][0]) for key, score in ranked]
+
+
+class SearchIndex:
+    """Per-user search indexes, built lazily and updated on create/update/delete"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._users = {}
+
+    def invalidate(self):
+        with self._lock:
+            self._users.clear()
+
+    def _user(self, user_id: str) -> UserSearchIndex:
+        index = self._users.get(user_id)
+        if index is None:
+            index = self._users[user_id] = UserSearchIndex()
+            for kind, collection in SEARCH_COLLECTIONS.items():
+                for record in storage.find(collection, user_id):
+                    index.add(kind, compact_record(collection, record))
+        return index
+
+    def add(self, kind: str, record):
+        with self._lock:
+            if record.get("user_id") in self._users:
+                self._users[record.get("user_id")].add(kind, compact_record(SEARCH_COLLECTIONS[kind], record))
+
+    def remove(self, kind: str, user_id: str, record_id: str):
+        with self._lock:
+            if user_id in self._users:
+                self._users[user_id].remove(kind, record_id)
+
+    def search(self, user_id: str, query: str, kinds: set = None) -> List[tuple]:
+        with self._lock:
+            return self._user(user_id).search(query, kinds)
+
+
+search_index = SearchIndex()
+version_stamps.on_change("media", search_index.invalidate)
+version_stamps.on_change("notes", search_index.invalidate)
+version_stamps.on_change("timeline", search_index.invalidate)
+
+@app.get("/api/search", response_class=FastJSONResponse)
+async def search(
+    request: Request,
+    q: str,
+    types: Optional[str] = None,
+    limit: int = Query(default=20, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    offset: int = Query(default=0, ge=0)
+):
+    user = get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    kinds = {t.strip() for t in types.split(",") if t.strip()} if types else None
+    hits = search_index.search(user["id"], q, kinds)
+    results = []
+    for score, kind, record in hits[offset:offset + limit]:
+        results.append({
+            "type": kind,
+            "score": round(score, 4),
+            "item": media_view(record) if kind == "media" else record.to_dict()
+        })
+    return FastJSONResponse({"results": results, "total": len(hits)})
+
+
+# ==================== Memories ====================
+
+# kind -> (collection, date field)
+DATE_INDEXED = {
+    "media": ("media", "date_taken"),
+    "timeline": ("timeline", "event_date"),
+}
+
+
+class UserDateIndex:
+    """One user's records sorted by a YYYY-MM-DD field, plus a month-day lookup"""
+
+    def __init__(self, date_field: str, records: List[CompactRecord]):
+        self.date_field = date_field
+        self.keys = []  # sorted (date, id)
+        self.records = {}
+        self.by_day = {}  # "MM-DD" -> sorted (date, id)
+        for record in records:
+            self.add(record)
+
+    def _key(self, record: CompactRecord) -> tuple:
+        return (record.get(self.date_field) or "", record.id)
+
+    def add(self, record: CompactRecord):
+        self.remove(record.id)
+        key = self._key(record)
+        self.records[record.id] = record
+        bisect.insort(self.keys, key)
+        if len(key[0]) >= 10:
+            bisect.insort(self.by_day.setdefault(key[0][5:10], []), key)
+
+    def remove(self, record_id: str):
+        record = self.records.pop(record_id, None)
+        if record is None:
+            return
+        key = self._key(record)
+        buckets = [self.keys]
+        if len(key[0]) >= 10:
+            buckets.append(self.by_day.get(key[0][5:10], []))
+        for bucket in buckets:
+            i = bisect.bisect_left(bucket, key)
+            if i < len(bucket) and bucket[i] == key:
+                bucket.pop(i)
+
+    def newest_first(self) -> List[CompactRecord]:
+        return [self.records[record_id] for _, record_id in reversed(self.keys)]
+
+    def between(self, start: str, end: str) -> List[CompactRecord]:
+        """Records dated start..end inclusive, newest first"""
+        lo = bisect.bisect_left(self.keys, (start, ""))
+        hi = bisect.bisect_right(self.keys, (end, "\uffff"))
+        return [self.records[record_id] for _, record_id in reversed(self.keys[lo:hi])]
+
+    def on_day(self, month_day: str, before_year: str) -> List[CompactRecord]:
+        """Records on month_day ("MM-DD") in years before before_year, newest first"""
+        bucket = self.by_day.get(month_day, [])
+        hi = bisect.bisect_left(bucket, (before_year, ""))
+        return [self.records[record_id] for _, record_id in reversed(bucket[:hi])]
+
+
+class DateIndex:
+    """Per-user date indexes for media and timeline events, maintained on writes"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._indexes = {}
+
+    def invalidate(self, kind: str = None):
+        with self._lock:
+            for key in [k for k in self._indexes if kind is None or k[0] == kind]:
+                del self._indexes[key]
+
+    def _index(self, kind: str, user_id: str) -> UserDateIndex:
+        index = self._indexes.get((kind, user_id))
+        if index is None:
+            collection, date_field = DATE_INDEXED[kind]
+            records = [compact_record(collection, r) for r in storage.find(collection, user_id)]
+            index = self._indexes[(kind, user_id)] = UserDateIndex(date_field, records)
+        return index
+
+    def add(self, kind: str, record):
+        with self._lock:
+            index = self._indexes.get((kind, record.get("user_id")))
+            if index is not None:
+                index.add(compact_record(DATE_INDEXED[kind][0], record))
+
+    def remove(self, kind: str, user_id: str, record_id: str):
+        with self._lock:
+            index = self._indexes.get((kind, user_id))
+            if index is not None:
+                index.remove(record_id)
+
+    def newest_first(self, kind: str, user_id: str) -> List[CompactRecord]:
+        with self._lock:
+            return self._index(kind, user_id).newest_first()
+
+    def between(self, kind: str, user_id: str, start: str, end: str) -> List[CompactRecord]:
+        with self._lock:
+            return self._index(kind, user_id).between(start, end)
+
+    def on_day(self, kind: str, user_id: str, month_day: str, before_year: str) -> List[CompactRecord]:
+        with self._lock:
+            return self._index(kind, user_id).on_day(month_day, before_year)
+
+
+date_index = DateIndex()
+version_stamps.on_change("media", lambda: date_index.invalidate("media"))
+version_stamps.on_change("timeline", lambda: date_index.invalidate("timeline"))
+
+def parse_date_param(value: str, name: str) -> str:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}, expected YYYY-MM-DD")
+
+@app.get("/api/memories", response_class=FastJSONResponse)
+async def get_memories_between(
+    request: Request,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    types: Optional[str] = None
+):
+    user = get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    start = parse_date_param(start, "start") if start else "0000-01-01"
+    end = parse_date_param(end, "end") if end else "9999-12-31"
+    kinds = {t.strip() for t in types.split(",")} if types else set(DATE_INDEXED)
+    result = {}
+    if "media" in kinds:
+        result["media"] = [media_view(m) for m in date_index.between("media", user["id"], start, end)]
+    if "timeline" in kinds:
+        result["events"] = record_dicts(date_index.between("timeline", user["id"], start, end))
+    return FastJSONResponse(result)
+
+@app.get("/api/memories/on-this-day", response_class=FastJSONResponse)
+async def get_on_this_day(request: Request, date: Optional[str] = None, types: Optional[str] = None):
+    user = get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    day = parse_date_param(date, "date") if date else datetime.now().date().isoformat()
+    kinds = {t.strip() for t in types.split(",")} if types else set(DATE_INDEXED)
+    result = {"date": day}
+    if "media" in kinds:
+        result["media"] = [media_view(m) for m in date_index.on_day("media", user["id"], day[5:], day[:4])]
+    if "timeline" in kinds:
+        result["events"] = record_dicts(date_index.on_day("timeline", user["id"], day[5:], day[:4]))
+    return FastJSONResponse(result)
+
+
+# ==================== Live Updates ====================
+
+PUBSUB_BACKEND = os.environ.get("PUBSUB_BACKEND", "file" if MULTI_PROCESS else "local")
+LIVE_QUEUE_SIZE = 100  # events buffered per subscriber before dropping
+LIVE_HEARTBEAT_INTERVAL = 15  # seconds between SSE keep-alive comments
+LIVE_EVENTS_FILE = Path("live_events.log.jsonl")  # shared by workers with the "file" backend
+LIVE_POLL_INTERVAL = 0.25  # seconds between reads of the shared events file
+LIVE_EVENTS_ROTATE_SIZE = 1024 * 1024  # bytes before the events file is started afresh
+
+
+class Broker(ABC):
+    """Pub/sub interface for live events; channels are couple (user) ids"""
+
+    @abstractmethod
+    def publish(self, channel: str, event: dict):
+        pass
+
+    @abstractmethod
+    def subscribe(self, channel: str) -> asyncio.Queue:
+        pass
+
+    @abstractmethod
+    def unsubscribe(self, channel: str, queue: asyncio.Queue):
+        pass
+
+    def close(self):
+        pass
+
+
+class LocalBroker(Broker):
+    """In-process fan-out; only reaches clients connected to this worker"""
+
+    def __init__(self):
+        self._subscribers = {}
+
+    def publish(self, channel: str, event: dict):
+        for queue in list(self._subscribers.get(channel, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                pass  # slow client; it will refetch on reconnect
+
+    def subscribe(self, channel: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=LIVE_QUEUE_SIZE)
+        self._subscribers.setdefault(channel, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, channel: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(channel)
+        if queues:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[channel]
+
+
+class FileBroker(Broker):
+    """Cross-worker fan-out through an append-only JSONL file that every worker tails"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._local = LocalBroker()
+        self._tail_task = None
+
+    def publish(self, channel: str, event: dict):
+        line = dump_json({"channel": channel, "event": event}) + b"\n"
+        with store_lock(self.path):
+            try:
+                rotate = os.stat(self.path).st_size >= LIVE_EVENTS_ROTATE_SIZE
+            except FileNotFoundError:
+                rotate = False
+            if rotate:
+                # Tailers finish the old file through their open handle, then switch
+                tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+                open(tmp_path, "wb").close()
+                os.replace(tmp_path, self.path)
+            with open(self.path, "ab") as f:
+                f.write(line)
+
+    def subscribe(self, channel: str) -> asyncio.Queue:
+        if self._tail_task is None or self._tail_task.done():
+            self._tail_task = asyncio.get_running_loop().create_task(self._tail())
+        return self._local.subscribe(channel)
+
+    def unsubscribe(self, channel: str, queue: asyncio.Queue):
+        self._local.unsubscribe(channel, queue)
+
+    def close(self):
+        if self._tail_task is not None:
+            self._tail_task.cancel()
+
+    def _dispatch(self, data: bytes):
+        for line in data.splitlines():
+            if line.strip():
+                message = parse_json(line)
+                self._local.publish(message["channel"], message["event"])
+
+    async def _tail(self):
+        open(self.path, "ab").close()
+        handle = open(self.path, "rb")
+        handle.seek(0, os.SEEK_END)  # only events published from now on
+        pending = b""
+        try:
+            while True:
+                await asyncio.sleep(LIVE_POLL_INTERVAL)
+                data = pending + handle.read()
+                try:
+                    rotated = os.stat(self.path).st_ino != os.fstat(handle.fileno()).st_ino
+                except FileNotFoundError:
+                    rotated = False
+                if rotated:
+                    data += handle.read()
+                    handle.close()
+                    handle = open(self.path, "rb")
+                # Lines are written whole under the lock; keep any unread tail
+                complete = data[:data.rfind(b"\n") + 1]
+                pending = data[len(complete):]
+                self._dispatch(complete)
+        finally:
+            handle.close()
+
+
+def create_broker() -> Broker:
+    if PUBSUB_BACKEND == "local":
+        return LocalBroker()
+    if PUBSUB_BACKEND == "file":
+        return FileBroker(LIVE_EVENTS_FILE)
+    raise ValueError(f"Unknown pub/sub backend: {PUBSUB_BACKEND}")
+
+
+broker = create_broker()
+
+def publish_event(user_id: str, event_type: str, data: dict):
+    broker.publish(user_id, {"type": event_type, "data": data})
+
+@app.get("/api/events")
+async def live_events(request: Request):
+    """Server-Sent Events stream of new kisses, moods, notes and timeline events"""
+    user = get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    async def stream():
+        queue = broker.subscribe(user["id"])
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), LIVE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {dump_json(event['data']).decode()}\n\n"
+        finally:
+            broker.unsubscribe(user["id"], queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+
+# ==================== Compression ====================
+
+COMPRESSION_MIN_SIZE = 1024  # bytes; smaller responses are sent as-is
+COMPRESSION_MAX_SIZE = 32 * 1024 * 1024  # larger responses are not buffered for compression
+COMPRESSIBLE_TYPES = {"application/json", "application/javascript", "image/svg+xml"}
+STATIC_COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".html", ".json", ".txt", ".map"}
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(token.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def compress_bytes(data: bytes, encoding: str, best: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if best else 5)
+    return gzip.compress(data, compresslevel=9 if best else 6)
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.split(";")[0].strip().lower()
+    if content_type == "text/event-stream":
+        return False
+    return content_type.startswith("text/") or content_type in COMPRESSIBLE_TYPES
+
+
+class CompressionMiddleware:
+    """Negotiated br/gzip compression of buffered responses above a size threshold.
+
+    Streaming responses without a Content-Length (SSE), already-encoded
+    responses and media types that do not compress are passed through.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+        chunks = []
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                headers = dict((k.lower(), v) for k, v in message.get("headers", []))
+                length = headers.get(b"content-length", b"").decode("latin-1")
+                if (b"content-encoding" in headers
+                        or not is_compressible(headers.get(b"content-type", b"").decode("latin-1"))
+                        or not length.isdigit()
+                        or not self.minimum_size <= int(length) <= COMPRESSION_MAX_SIZE):
+                    await send(message)
+                    return
+                start_message = message
+                return
+            if start_message is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = compress_bytes(b"".join(chunks), encoding)
+            headers = [(k, v) for k, v in start_message["headers"]
+                       if k.lower() not in (b"content-length", b"vary")]
+            vary = [v for k, v in start_message["headers"] if k.lower() == b"vary"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", b", ".join(vary + [b"Accept-Encoding"])),
+            ]
+            await send(dict(start_message, headers=headers))
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+app.add_middleware(CompressionMiddleware)
+
+_static_manifest = None  # relative path -> content hash
+
+def build_static_assets() -> dict:
+    """Fingerprint static files and write their .br/.gz variants to STATIC_CACHE_DIR"""
+    global _static_manifest
+    manifest = {}
+    encodings = [e for e in ENCODING_SUFFIXES if e != "br" or brotli is not None]
+    for path in sorted(STATIC_DIR.rglob("*")):
+        if not path.is_file():
+            continue
+        rel = path.relative_to(STATIC_DIR).as_posix()
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        manifest[rel] = digest
+        if path.suffix.lower() not in STATIC_COMPRESSIBLE_EXTENSIONS:
+            continue
+        for encoding in encodings:
+            target = STATIC_CACHE_DIR / f"{rel}.{digest}{ENCODING_SUFFIXES[encoding]}"
+            if target.exists():
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(compress_bytes(data, encoding, best=True))
+            os.replace(tmp_path, target)
+    _static_manifest = manifest
+    return manifest
+
+def get_static_manifest() -> dict:
+    if _static_manifest is None:
+        build_static_assets()
+    return _static_manifest
+
+def static_url(path: str) -> str:
+    """Fingerprinted URL for a static file, cacheable forever"""
+    digest = get_static_manifest().get(path)
+    return f"/static/{path}?v={digest}" if digest else f"/static/{path}"
+
+templates.env.globals["static_url"] = static_url
+
+@app.api_route("/static/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_static(request: Request, file_path: str, v: Optional[str] = None):
+    base = STATIC_DIR.resolve()
+    path = (STATIC_DIR / file_path).resolve()
+    if base not in path.parents or not path.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+
+    rel = path.relative_to(base).as_posix()
+    digest = get_static_manifest().get(rel)
+    headers = {"Vary": "Accept-Encoding"}
+    if digest and v == digest:
+        headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        headers["Cache-Control"] = "no-cache"
+
+    file_to_send = path
+    encoding = choose_encoding(request.headers.get("accept-encoding", "")) if digest else None
+    if encoding:
+        variant = STATIC_CACHE_DIR / f"{rel}.{digest}{ENCODING_SUFFIXES[encoding]}"
+        if variant.is_file():
+            file_to_send = variant
+            headers["Content-Encoding"] = encoding
+        else:
+            encoding = None
+    if digest:
+        headers["ETag"] = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+        if_none_match = request.headers.get("if-none-match", "")
+        if headers["ETag"] in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    return FileResponse(file_to_send, media_type=media_type, headers=headers)
+
+
 # ==================== Auth Routes ====================
 
 @app.get("/login")
@@ -221,13 +2708,11 @@ async def signup(
             content={"success": False, "message": "Username already exists"}
         )
 
-    data = load_users()
-    for user in data["users"]:
-        if user["email"].lower() == email.lower():
-            return JSONResponse(
-                status_code=400,
-                content={"success": False, "message": "Email already registered"}
-            )
+    if get_user_by_email(email):
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "message": "Email already registered"}
+        )
 
     user_id = str(uuid.uuid4())
     new_user = {
@@ -241,8 +2726,7 @@ async def signup(
         "created_at": datetime.now().isoformat()
     }
 
-    data["users"].append(new_user)
-    save_users(data)
+    add_user(new_user)
 
     return {"success": True, "message": "Account created successfully"}
 
@@ -266,7 +2750,7 @@ async def login(
         key="session_token",
         value=token,
         httponly=True,
-        max_age=7 * 24 * 60 * 60,
+        max_age=SESSION_MAX_AGE,
         samesite="lax"
     )
 
@@ -335,21 +2819,14 @@ async def upload_media(
         raise HTTPException(status_code=400, detail="File type not allowed")
 
     file_id = str(uuid.uuid4())
-    new_filename = f"{file_id}{ext}"
-
-    if file_type == "image":
-        save_path = UPLOAD_DIR / "images" / new_filename
-    else:
-        save_path = UPLOAD_DIR / "videos" / new_filename
+    upload_dir = UPLOAD_DIR / ("images" if file_type == "image" else "videos")
 
     try:
-        with open(save_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        file_size = os.path.getsize(save_path)
+        new_filename, file_size, content_hash, _ = await store_blob(file, upload_dir, ext)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
-    finally:
-        file.file.close()
 
     media_item = {
         "id": file_id,
@@ -362,10 +2839,16 @@ async def upload_media(
         "created_at": datetime.now().isoformat(),
         "is_favorite": False,
         "file_size": file_size,
+        "content_hash": content_hash,
         "user_id": user["id"]
     }
 
-    add_media(media_item)
+    try:
+        add_media(media_item)
+    except Exception:
+        discard_blob(media_item)
+        raise
+    schedule_metadata_extraction([media_item], use_exif_date=not date_taken)
 
     return {
         "success": True,
@@ -375,6 +2858,52 @@ async def upload_media(
         "message": "File uploaded successfully"
     }
 
+async def ingest_batch_file(file: UploadFile, user_id: str, category: str, caption: str,
+                            budget: UploadBudget) -> tuple:
+    """Store one file of a multi-upload; returns (result, media_item or None)"""
+    ext = get_file_extension(file.filename)
+    file_type = get_file_type(file.filename)
+
+    if file_type == "unknown":
+        await file.close()
+        return {
+            "filename": file.filename,
+            "success": False,
+            "error": "File type not allowed"
+        }, None
+
+    file_id = str(uuid.uuid4())
+    upload_dir = UPLOAD_DIR / ("images" if file_type == "image" else "videos")
+
+    try:
+        new_filename, file_size, content_hash, _ = await store_blob(file, upload_dir, ext, budget)
+    except HTTPException as e:
+        return {"filename": file.filename, "success": False, "error": e.detail}, None
+    except Exception as e:
+        return {"filename": file.filename, "success": False, "error": str(e)}, None
+
+    media_item = {
+        "id": file_id,
+        "filename": new_filename,
+        "original_name": file.filename,
+        "file_type": file_type,
+        "category": category,
+        "caption": caption,
+        "date_taken": datetime.now().strftime("%Y-%m-%d"),
+        "created_at": datetime.now().isoformat(),
+        "is_favorite": False,
+        "file_size": file_size,
+        "content_hash": content_hash,
+        "user_id": user_id
+    }
+
+    return {
+        "filename": file.filename,
+        "success": True,
+        "id": file_id,
+        "file_type": file_type
+    }, media_item
+
 @app.post("/api/upload-multiple")
 async def upload_multiple_media(
     request: Request,
@@ -386,97 +2915,73 @@ async def upload_multiple_media(
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    results = []
+    budget = UploadBudget()
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
 
-    for file in files:
-        ext = get_file_extension(file.filename)
-        file_type = get_file_type(file.filename)
+    async def process(file: UploadFile) -> tuple:
+        async with semaphore:
+            return await ingest_batch_file(file, user["id"], category, caption, budget)
 
-        if file_type == "unknown":
-            results.append({
-                "filename": file.filename,
-                "success": False,
-                "error": "File type not allowed"
-            })
-            continue
-
-        file_id = str(uuid.uuid4())
-        new_filename = f"{file_id}{ext}"
-
-        if file_type == "image":
-            save_path = UPLOAD_DIR / "images" / new_filename
-        else:
-            save_path = UPLOAD_DIR / "videos" / new_filename
-
-        try:
-            with open(save_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-
-            file_size = os.path.getsize(save_path)
+    outcomes = await asyncio.gather(*(process(file) for file in files))
+    media_items = [item for _, item in outcomes if item]
 
-            media_item = {
-                "id": file_id,
-                "filename": new_filename,
-                "original_name": file.filename,
-                "file_type": file_type,
-                "category": category,
-                "caption": caption,
-                "date_taken": datetime.now().strftime("%Y-%m-%d"),
-                "created_at": datetime.now().isoformat(),
-                "is_favorite": False,
-                "file_size": file_size,
-                "user_id": user["id"]
-            }
+    try:
+        add_media_many(media_items)
+    except Exception as e:
+        # Give back the references taken when storing; shared blobs stay on disk
+        for item in media_items:
+            discard_blob(item)
+        return {"results": [
+            {"filename": result["filename"], "success": False, "error": str(e)}
+            if result["success"] else result
+            for result, _ in outcomes
+        ]}
 
-            add_media(media_item)
+    schedule_metadata_extraction(media_items)
 
-            results.append({
-                "filename": file.filename,
-                "success": True,
-                "id": file_id,
-                "file_type": file_type
-            })
-        except Exception as e:
-            results.append({
-                "filename": file.filename,
-                "success": False,
-                "error": str(e)
-            })
-        finally:
-            file.file.close()
-
-    return {"results": results}
+    return {"results": [result for result, _ in outcomes]}
 
-@app.get("/api/media")
+@app.get("/api/media", response_class=FastJSONResponse)
 async def get_all_media(
     request: Request,
     file_type: Optional[str] = None,
-    category: Optional[str] = None
+    category: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_MEDIA_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None
 ):
     user = get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    media_list = get_user_media(user["id"], file_type, category)
-    return {"media": media_list, "total": len(media_list)}
+    return FastJSONResponse(media_listing(user["id"], file_type, category, limit, after, fields))
 
-@app.get("/api/images")
-async def get_images(request: Request, category: Optional[str] = None):
+@app.get("/api/images", response_class=FastJSONResponse)
+async def get_images(
+    request: Request,
+    category: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_MEDIA_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None
+):
     user = get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    media_list = get_user_media(user["id"], "image", category)
-    return {"media": media_list, "total": len(media_list)}
+    return FastJSONResponse(media_listing(user["id"], "image", category, limit, after, fields))
 
-@app.get("/api/videos")
-async def get_videos(request: Request):
+@app.get("/api/videos", response_class=FastJSONResponse)
+async def get_videos(
+    request: Request,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_MEDIA_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None
+):
     user = get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    media_list = get_user_media(user["id"], "video")
-    return {"media": media_list, "total": len(media_list)}
+    return FastJSONResponse(media_listing(user["id"], "video", None, limit, after, fields))
 
 @app.get("/api/media/{media_id}")
 async def get_media(request: Request, media_id: str):
@@ -496,13 +3001,10 @@ async def toggle_favorite(request: Request, media_id: str):
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    media_item = get_media_by_id(media_id, user["id"])
-    if not media_item:
+    new_value = toggle_media_favorite(media_id, user["id"])
+    if new_value is None:
         raise HTTPException(status_code=404, detail="Media not found")
 
-    new_value = not media_item.get("is_favorite", False)
-    update_media(media_id, user["id"], {"is_favorite": new_value})
-
     return {"success": True, "is_favorite": new_value}
 
 @app.delete("/api/media/{media_id}")
@@ -515,18 +3017,243 @@ async def delete_media(request: Request, media_id: str):
     if not deleted:
         raise HTTPException(status_code=404, detail="Media not found")
 
-    # Delete file
-    if deleted["file_type"] == "image":
-        file_path = UPLOAD_DIR / "images" / deleted["filename"]
-    else:
-        file_path = UPLOAD_DIR / "videos" / deleted["filename"]
-
-    if file_path.exists():
-        os.remove(file_path)
+    # Delete the file once no other media record references it
+    discard_blob(deleted)
 
     return {"success": True, "message": "Media deleted successfully"}
 
 
+# ==================== Album Import ====================
+
+IMPORT_DIR = UPLOAD_DIR / "imports"
+IMPORT_CONCURRENCY = 4  # archive entries extracted in parallel
+IMPORT_BATCH_SIZE = 100  # media records committed per storage write
+IMPORT_PROGRESS_INTERVAL = 1.0  # seconds between job progress writes while running
+
+def extract_zip_entry(archive: zipfile.ZipFile, entry_name: str, directory: Path, ext: str) -> tuple:
+    """Stream one archive entry into a content-addressed blob; runs in a worker thread.
+
+    The archive is opened once per import and shared: ZipFile serialises the
+    underlying reads, so several threads can extract members at once.
+
+    Returns (filename, file_size, content_hash).
+    """
+    staging_path = directory / f".{uuid.uuid4().hex}{ext}.staging"
+    digest = hashlib.sha256()
+    file_size = 0
+    start = time.perf_counter()
+    try:
+        with timed("import_copy"), archive.open(entry_name) as source, open(staging_path, "wb") as buffer:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                if file_size > MAX_UPLOAD_FILE_SIZE:
+                    raise ValueError("File too large")
+                digest.update(chunk)
+                buffer.write(chunk)
+        filename = f"{digest.hexdigest()}{ext}"
+        commit_blob(staging_path, directory / filename)
+    except BaseException:
+        if staging_path.exists():
+            os.remove(staging_path)
+        raise
+    record_upload("import", file_size, time.perf_counter() - start)
+    return filename, file_size, digest.hexdigest()
+
+def is_importable_entry(info: zipfile.ZipInfo) -> bool:
+    name = Path(info.filename)
+    if info.is_dir() or name.name.startswith(".") or "__MACOSX" in name.parts:
+        return False
+    return True
+
+async def run_import_job(job: dict, zip_path: Path, category: str, caption: str):
+    started = time.monotonic()
+    job["status"] = "running"
+    pending = []
+    semaphore = asyncio.Semaphore(IMPORT_CONCURRENCY)
+    progress_lock = asyncio.Lock()
+    progress_task = None
+    failure = None  # first batch commit error; the remaining entries are skipped
+
+    def update_rates():
+        elapsed = max(time.monotonic() - started, 1e-6)
+        job["elapsed"] = round(elapsed, 3)
+        job["files_per_second"] = round(job["processed"] / elapsed, 2)
+        job["bytes_per_second"] = round(job["bytes"] / elapsed)
+
+    async def flush():
+        batch = pending[:]
+        pending.clear()
+        if batch:
+            try:
+                add_media_many(batch)
+            except Exception:
+                for item in batch:
+                    discard_blob(item)
+                raise
+            schedule_metadata_extraction(batch)
+            job["imported"] += len(batch)
+        update_rates()
+        storage.update("imports", job["id"], job)
+
+    async def report_progress():
+        # Batches can be far apart (few large files, or every entry failing),
+        # so the status endpoint gets processed/errors/rates on a timer too
+        while True:
+            await asyncio.sleep(IMPORT_PROGRESS_INTERVAL)
+            async with progress_lock:
+                update_rates()
+                storage.update("imports", job["id"], job)
+
+    async def ingest(archive: zipfile.ZipFile, info: zipfile.ZipInfo):
+        nonlocal failure
+        ext = get_file_extension(info.filename)
+        file_type = get_file_type(info.filename)
+        error = None
+        async with semaphore:
+            if failure is not None:
+                return
+            if file_type == "unknown":
+                error = "File type not allowed"
+            elif info.file_size > MAX_UPLOAD_FILE_SIZE:
+                error = "File too large"
+            else:
+                upload_dir = UPLOAD_DIR / ("images" if file_type == "image" else "videos")
+                try:
+                    filename, file_size, content_hash = await asyncio.to_thread(
+                        extract_zip_entry, archive, info.filename, upload_dir, ext
+                    )
+                except Exception as e:
+                    error = str(e)
+        async with progress_lock:
+            if failure is not None:
+                # Extracted after a batch failed: give back its blob reference
+                if error is None:
+                    discard_blob({"filename": filename, "file_type": file_type})
+                return
+            job["processed"] += 1
+            if error:
+                job["errors"].append({"filename": info.filename, "error": error})
+                return
+            job["bytes"] += file_size
+            year, month, day = info.date_time[:3]
+            pending.append({
+                "id": str(uuid.uuid4()),
+                "filename": filename,
+                "original_name": Path(info.filename).name,
+                "file_type": file_type,
+                "category": category,
+                "caption": caption,
+                "date_taken": f"{year:04d}-{month:02d}-{day:02d}",
+                "created_at": datetime.now().isoformat(),
+                "is_favorite": False,
+                "file_size": file_size,
+                "content_hash": content_hash,
+                "user_id": job["user_id"]
+            })
+            if len(pending) >= IMPORT_BATCH_SIZE:
+                try:
+                    await flush()
+                except Exception as e:
+                    failure = e
+
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            entries = [info for info in archive.infolist() if is_importable_entry(info)]
+            job["total"] = len(entries)
+            storage.update("imports", job["id"], job)
+            progress_task = asyncio.create_task(report_progress())
+            # Let every entry finish before the archive closes, so no thread
+            # is still reading it or holding a blob nobody will commit
+            results = await asyncio.gather(*(ingest(archive, info) for info in entries),
+                                           return_exceptions=True)
+        if failure is None:
+            failure = next((r for r in results if isinstance(r, Exception)), None)
+        if failure is not None:
+            raise failure
+        await flush()
+        job["status"] = "completed"
+    except Exception as e:
+        for item in pending:
+            discard_blob(item)
+        pending.clear()
+        job["status"] = "failed"
+        job["errors"].append({"filename": None, "error": str(e)})
+    finally:
+        if progress_task is not None:
+            progress_task.cancel()
+            await asyncio.gather(progress_task, return_exceptions=True)
+        if zip_path.exists():
+            os.remove(zip_path)
+        update_rates()
+        job["finished_at"] = datetime.now().isoformat()
+        storage.update("imports", job["id"], job)
+
+@app.post("/api/import")
+async def start_import(
+    request: Request,
+    file: UploadFile = File(...),
+    category: str = Form(default="dates"),
+    caption: str = Form(default="")
+):
+    user = get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    if get_file_extension(file.filename) != ".zip":
+        raise HTTPException(status_code=400, detail="Only ZIP archives can be imported")
+
+    IMPORT_DIR.mkdir(exist_ok=True)
+    job_id = str(uuid.uuid4())
+    zip_path = IMPORT_DIR / f"{job_id}.zip"
+    try:
+        await store_upload(file, zip_path, max_size=MAX_UPLOAD_REQUEST_SIZE)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+
+    if not zipfile.is_zipfile(zip_path):
+        os.remove(zip_path)
+        raise HTTPException(status_code=400, detail="Invalid ZIP archive")
+
+    job = {
+        "id": job_id,
+        "status": "queued",
+        "archive": file.filename,
+        "total": None,
+        "processed": 0,
+        "imported": 0,
+        "bytes": 0,
+        "errors": [],
+        "elapsed": 0,
+        "files_per_second": 0,
+        "bytes_per_second": 0,
+        "created_at": datetime.now().isoformat(),
+        "finished_at": None,
+        "user_id": user["id"]
+    }
+    storage.insert("imports", job)
+
+    run_in_background(run_import_job(job, zip_path, category, caption))
+
+    return JSONResponse(status_code=202, content={"success": True, "job": job})
+
+@app.get("/api/import/{job_id}")
+async def get_import_status(request: Request, job_id: str):
+    user = get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    job = storage.get("imports", job_id, user["id"])
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+
+    return {"success": True, "job": job}
+
+
 # ==================== Profile Image ====================
 
 @app.post("/api/profile-image")
@@ -546,31 +3273,25 @@ async def upload_profile_image(
     profile_dir = UPLOAD_DIR / "profiles"
     profile_dir.mkdir(exist_ok=True)
 
-    # Delete old profile image if exists
-    if user.get("profile_image"):
-        old_path = UPLOAD_DIR / "profiles" / user["profile_image"]
-        if old_path.exists():
-            os.remove(old_path)
-
     # Save new profile image
     new_filename = f"{user['id']}{ext}"
     save_path = profile_dir / new_filename
 
     try:
-        with open(save_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await store_upload(file, save_path)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
-    finally:
-        file.file.close()
+
+    # Delete old profile image if it had a different extension
+    if user.get("profile_image") and user["profile_image"] != new_filename:
+        old_path = UPLOAD_DIR / "profiles" / user["profile_image"]
+        if old_path.exists():
+            os.remove(old_path)
 
     # Update user data
-    data = load_users()
-    for u in data["users"]:
-        if u["id"] == user["id"]:
-            u["profile_image"] = new_filename
-            break
-    save_users(data)
+    update_user(user["id"], {"profile_image": new_filename})
 
     return {
         "success": True,
@@ -597,11 +3318,11 @@ async def get_stats(request: Request):
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    media_list = get_user_media(user["id"])
+    counters = get_counters(user["id"])
 
-    image_count = len([m for m in media_list if m["file_type"] == "image"])
-    video_count = len([m for m in media_list if m["file_type"] == "video"])
-    favorites_count = len([m for m in media_list if m.get("is_favorite")])
+    image_count = counters["images"]
+    video_count = counters["videos"]
+    favorites_count = counters["favorites"]
 
     # Calculate days together
     days_together = 0
@@ -623,18 +3344,16 @@ async def get_stats(request: Request):
 
 # ==================== Timeline ====================
 
-@app.get("/api/timeline")
+@app.get("/api/timeline", response_class=FastJSONResponse)
 async def get_timeline(request: Request):
     user = get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    data = load_timeline()
-    user_events = [e for e in data["events"] if e.get("user_id") == user["id"]]
-    # Sort by date descending
-    user_events.sort(key=lambda x: x.get("event_date", ""), reverse=True)
+    # Kept sorted by date in the date index; newest first
+    user_events = record_dicts(date_index.newest_first("timeline", user["id"]))
 
-    return {"events": user_events}
+    return FastJSONResponse({"events": user_events})
 
 @app.post("/api/timeline")
 async def create_timeline_event(
@@ -663,13 +3382,12 @@ async def create_timeline_event(
             save_path = timeline_img_dir / new_filename
 
             try:
-                with open(save_path, "wb") as buffer:
-                    shutil.copyfileobj(image.file, buffer)
+                await store_upload(image, save_path)
                 image_url = f"/uploads/timeline/{new_filename}"
+            except HTTPException:
+                raise
             except Exception as e:
                 print(f"Failed to save timeline image: {e}")
-            finally:
-                image.file.close()
 
     new_event = {
         "id": event_id,
@@ -681,9 +3399,13 @@ async def create_timeline_event(
         "user_id": user["id"]
     }
 
-    data = load_timeline()
-    data["events"].append(new_event)
-    save_timeline(data)
+    with storage.transaction("timeline"):
+        storage.insert("timeline", new_event)
+        bump_counters(user["id"], timeline=1)
+    event_record = compact_record("timeline", new_event)
+    search_index.add("timeline", event_record)
+    date_index.add("timeline", event_record)
+    publish_event(user["id"], "timeline", new_event)
 
     return {"success": True, "id": event_id, "event": new_event}
 
@@ -693,55 +3415,64 @@ async def delete_timeline_event(request: Request, event_id: str):
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    data = load_timeline()
-    for i, event in enumerate(data["events"]):
-        if event["id"] == event_id and event.get("user_id") == user["id"]:
-            # Delete image file if exists
-            if event.get("image"):
-                image_filename = event["image"].split("/")[-1]
-                image_path = UPLOAD_DIR / "timeline" / image_filename
-                if image_path.exists():
-                    os.remove(image_path)
+    with storage.transaction("timeline"):
+        event = storage.delete("timeline", event_id, user["id"])
+        if event:
+            bump_counters(user["id"], timeline=-1)
+            search_index.remove("timeline", user["id"], event_id)
+            date_index.remove("timeline", user["id"], event_id)
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
 
-            data["events"].pop(i)
-            save_timeline(data)
-            return {"success": True, "message": "Event deleted"}
+    # Delete image file if exists
+    if event.get("image"):
+        image_filename = event["image"].split("/")[-1]
+        image_path = UPLOAD_DIR / "timeline" / image_filename
+        if image_path.exists():
+            os.remove(image_path)
 
-    raise HTTPException(status_code=404, detail="Event not found")
+    return {"success": True, "message": "Event deleted"}
 
 
 # ==================== Love Notes ====================
 
 def load_notes() -> dict:
-    return load_json(NOTES_FILE, {"notes": []})
+    return storage.load("notes")
 
 def save_notes(data: dict):
-    save_json(NOTES_FILE, data)
+    storage.save("notes", data)
+    search_index.invalidate()
+    reset_counters()
 
 def load_kisses() -> dict:
-    return load_json(Path("kisses.json"), {"kisses": []})
+    kiss_log.compact()
+    return storage.load("kisses")
 
 def save_kisses(data: dict):
-    save_json(Path("kisses.json"), data)
+    kiss_log.compact()
+    storage.save("kisses", data)
+    kiss_log.invalidate()
 
 def load_moods() -> dict:
-    return load_json(Path("moods.json"), {"moods": []})
+    mood_log.compact()
+    return storage.load("moods")
 
 def save_moods(data: dict):
-    save_json(Path("moods.json"), data)
+    mood_log.compact()
+    storage.save("moods", data)
+    mood_log.invalidate()
 
-@app.get("/api/notes")
+@app.get("/api/notes", response_class=FastJSONResponse)
 async def get_notes(request: Request):
     user = get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    data = load_notes()
-    user_notes = [note for note in data["notes"] if note.get("user_id") == user["id"]]
+    user_notes = storage.find("notes", user["id"])
     # Sort by created_at descending
     user_notes.sort(key=lambda x: x.get("created_at", ""), reverse=True)
     
-    return {"notes": user_notes}
+    return FastJSONResponse({"notes": user_notes})
 
 @app.post("/api/notes")
 async def create_note(
@@ -764,9 +3495,11 @@ async def create_note(
         "user_id": user["id"]
     }
     
-    data = load_notes()
-    data["notes"].append(new_note)
-    save_notes(data)
+    with storage.transaction("notes"):
+        storage.insert("notes", new_note)
+        bump_counters(user["id"], notes=1)
+    search_index.add("note", new_note)
+    publish_event(user["id"], "note", new_note)
     
     return {"success": True, "note": new_note}
 
@@ -776,14 +3509,15 @@ async def delete_note(request: Request, note_id: str):
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    data = load_notes()
-    for i, note in enumerate(data["notes"]):
-        if note["id"] == note_id and note.get("user_id") == user["id"]:
-            data["notes"].pop(i)
-            save_notes(data)
-            return {"success": True, "message": "Note deleted"}
+    with storage.transaction("notes"):
+        deleted = storage.delete("notes", note_id, user["id"])
+        if deleted:
+            bump_counters(user["id"], notes=-1)
+            search_index.remove("note", user["id"], note_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Note not found")
     
-    raise HTTPException(status_code=404, detail="Note not found")
+    return {"success": True, "message": "Note deleted"}
 
 
 # ==================== Virtual Kisses ====================
@@ -803,21 +3537,19 @@ async def send_kiss(request: Request, to: str = Form(...)):
         "user_id": user["id"]
     }
     
-    data = load_kisses()
-    data["kisses"].append(new_kiss)
-    save_kisses(data)
+    kiss_log.append(new_kiss)
+    publish_event(user["id"], "kiss", new_kiss)
     
     return {"success": True, "kiss": new_kiss}
 
-@app.get("/api/kisses")
+@app.get("/api/kisses", response_class=FastJSONResponse)
 async def get_kisses(request: Request):
     user = get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    data = load_kisses()
-    user_kisses = [k for k in data["kisses"] if k.get("user_id") == user["id"]]
-    return {"kisses": user_kisses}
+    user_kisses = record_dicts(kiss_log.find(user["id"]))
+    return FastJSONResponse({"kisses": user_kisses})
 
 
 # ==================== Mood Tracker ====================
@@ -831,10 +3563,6 @@ async def set_mood(request: Request, mood: str = Form(...), message: str = Form(
     author = request.cookies.get("user_identity", "prem")
     today = datetime.now().date().isoformat()
     
-    data = load_moods()
-    # Remove today's mood if exists
-    data["moods"] = [m for m in data["moods"] if not (m.get("author") == author and m.get("date") == today)]
-    
     new_mood = {
         "id": str(uuid.uuid4()),
         "mood": mood,
@@ -845,22 +3573,22 @@ async def set_mood(request: Request, mood: str = Form(...), message: str = Form(
         "user_id": user["id"]
     }
     
-    data["moods"].append(new_mood)
-    save_moods(data)
+    # Replaces today's mood for this author if one exists
+    mood_log.append(new_mood)
+    publish_event(user["id"], "mood", new_mood)
     
     return {"success": True, "mood": new_mood}
 
-@app.get("/api/moods")
+@app.get("/api/moods", response_class=FastJSONResponse)
 async def get_moods(request: Request):
     user = get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    data = load_moods()
     today = datetime.now().date().isoformat()
-    user_moods = [m for m in data["moods"] if m.get("user_id") == user["id"] and m.get("date") == today]
+    user_moods = [m.to_dict() for m in mood_log.find(user["id"]) if m.get("date") == today]
     
-    return {"moods": user_moods}
+    return FastJSONResponse({"moods": user_moods})
 
 
 # ==================== Love Meter ====================
@@ -872,10 +3600,11 @@ async def get_love_meter(request: Request):
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     # Calculate love score based on interactions
-    media_count = len(get_user_media(user["id"]))
-    notes_count = len(load_notes()["notes"])
-    timeline_count = len([e for e in load_timeline()["events"] if e.get("user_id") == user["id"]])
-    kisses_count = len([k for k in load_kisses()["kisses"] if k.get("user_id") == user["id"]])
+    counters = get_counters(user["id"])
+    media_count = counters["images"] + counters["videos"]
+    notes_count = counters["notes"]
+    timeline_count = counters["timeline"]
+    kisses_count = counters["kisses"]
     
     # Calculate score (max 100)
     score = min(100, (media_count * 2) + (notes_count * 5) + (timeline_count * 8) + (kisses_count * 3))
@@ -890,6 +3619,27 @@ async def get_love_meter(request: Request):
 
 
 if __name__ == "__main__":
+    import argparse
     import uvicorn
-    print("Starting Love Album server with fun features...")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+
+    parser = argparse.ArgumentParser(description="Our Forever - Couple Album")
+    parser.add_argument("--migrate", action="store_true",
+                        help="import the JSON files into the SQLite database and exit")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="worker processes; they coordinate through file stamps and locks")
+    args = parser.parse_args()
+
+    if args.migrate:
+        counts = migrate_json_to_sqlite()
+        for collection, count in counts.items():
+            print(f"Imported {count} {collection} records into {SQLITE_DB_FILE}")
+    else:
+        print("Starting Love Album server with fun features...")
+        if args.workers > 1:
+            # Workers import "app" afresh and read this to size their pools
+            os.environ["WEB_CONCURRENCY"] = str(args.workers)
+            uvicorn.run("app:app", host=args.host, port=args.port, workers=args.workers)
+        else:
+            uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,356 @@
+"""Benchmark and load-test harness for the Love Album API.
+
+Each dataset size runs in a fresh process: synthetic users/media/notes/kisses
+files are generated in a temporary directory, the app is imported there and
+driven in-process through httpx's ASGI transport, so no server or network is
+involved. Results are written as JSON for comparison between runs.
+
+    python benchmark.py --records 1000 10000 100000 --concurrency 1 8 32
+    python benchmark.py --records 1000000 --operations me media stats --output big.json
+    python benchmark.py --backend sqlite --output sqlite.json
+    python benchmark.py --json-backends auto stdlib --operations media stats  # orjson vs json
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+REPO_DIR = Path(__file__).resolve().parent
+OPERATIONS = ["login", "me", "media", "media_page", "stats", "love_meter", "send_kiss", "upload"]
+BENCH_PASSWORD = "benchmark"
+CATEGORIES = ["dates", "travel", "special", "everyday"]
+NOTE_COLORS = ["pink", "purple", "blue", "yellow"]
+PARTNERS = ["prem", "nisha"]
+
+
+# ==================== Dataset Generation ====================
+
+def seeded_uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def write_collection(path: Path, key: str, records):
+    """Stream records into a {key: [...]} JSON file without holding them all in memory"""
+    with open(path, "w") as f:
+        f.write('{\n  "%s": [\n' % key)
+        first = True
+        for record in records:
+            if not first:
+                f.write(",\n")
+            f.write("    " + json.dumps(record))
+            first = False
+        f.write("\n  ]\n}\n")
+
+def generate_dataset(directory: Path, records: int, users: int, seed: int) -> List[dict]:
+    """Write users.json, media.json, notes.json and kisses.json; returns the users"""
+    rng = random.Random(seed)
+    epoch = datetime(2020, 1, 1)
+    password_hash = hashlib.sha256(BENCH_PASSWORD.encode()).hexdigest()
+
+    user_list = [{
+        "id": seeded_uuid(rng),
+        "username": f"bench{i}",
+        "email": f"bench{i}@example.com",
+        "password": password_hash,
+        "partner1": "Prem",
+        "partner2": "Nisha",
+        "anniversary": (epoch + timedelta(days=rng.randrange(1000))).strftime("%Y-%m-%d"),
+        "created_at": epoch.isoformat(),
+    } for i in range(users)]
+    write_collection(directory / "users.json", "users", user_list)
+
+    def timestamps():
+        # Increasing creation times, as the app appends them
+        moment = epoch
+        for _ in range(records):
+            moment += timedelta(seconds=rng.randrange(1, 600))
+            yield moment
+
+    def media():
+        for i, moment in enumerate(timestamps()):
+            file_id = seeded_uuid(rng)
+            is_image = rng.random() < 0.8
+            yield {
+                "id": file_id,
+                "filename": f"{file_id}{'.jpeg' if is_image else '.mp4'}",
+                "original_name": f"IMG_{i:07d}{'.jpeg' if is_image else '.mp4'}",
+                "file_type": "image" if is_image else "video",
+                "category": rng.choice(CATEGORIES),
+                "caption": f"memory number {i}",
+                "date_taken": moment.strftime("%Y-%m-%d"),
+                "created_at": moment.isoformat(),
+                "is_favorite": rng.random() < 0.1,
+                "file_size": rng.randrange(50_000, 5_000_000),
+                "user_id": user_list[i % users]["id"],
+            }
+
+    def notes():
+        for i, moment in enumerate(timestamps()):
+            yield {
+                "id": seeded_uuid(rng),
+                "message": f"love note {i}",
+                "color": rng.choice(NOTE_COLORS),
+                "author": rng.choice(PARTNERS),
+                "created_at": moment.isoformat(),
+                "user_id": user_list[i % users]["id"],
+            }
+
+    def kisses():
+        for i, moment in enumerate(timestamps()):
+            yield {
+                "id": seeded_uuid(rng),
+                "from": rng.choice(PARTNERS),
+                "to": rng.choice(PARTNERS),
+                "created_at": moment.isoformat(),
+                "user_id": user_list[i % users]["id"],
+            }
+
+    write_collection(directory / "media.json", "media", media())
+    write_collection(directory / "notes.json", "notes", notes())
+    write_collection(directory / "kisses.json", "kisses", kisses())
+    return user_list
+
+
+# ==================== Load Generation ====================
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+def summarize(latencies: List[float], errors: int, wall: float) -> dict:
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+async def login(client, username: str) -> str:
+    response = await client.post("/api/login", data={"username": username, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return response.cookies["session_token"]
+
+def build_request(operation: str, username: str, token: str, upload_size: int) -> dict:
+    cookies = {"Cookie": f"session_token={token}; user_identity=prem"}
+    if operation == "login":
+        return {"method": "POST", "url": "/api/login",
+                "data": {"username": username, "password": BENCH_PASSWORD}}
+    if operation == "me":
+        return {"method": "GET", "url": "/api/me", "headers": cookies}
+    if operation == "media":
+        return {"method": "GET", "url": "/api/media", "headers": cookies}
+    if operation == "media_page":
+        return {"method": "GET", "url": "/api/media", "params": {"limit": 50}, "headers": cookies}
+    if operation == "stats":
+        return {"method": "GET", "url": "/api/stats", "headers": cookies}
+    if operation == "love_meter":
+        return {"method": "GET", "url": "/api/love-meter", "headers": cookies}
+    if operation == "send_kiss":
+        return {"method": "POST", "url": "/api/send-kiss", "data": {"to": "nisha"}, "headers": cookies}
+    if operation == "upload":
+        # Random bytes as a video: unique content (no dedup) and no image post-processing
+        return {"method": "POST", "url": "/api/upload", "headers": cookies,
+                "data": {"category": "dates", "caption": "benchmark"},
+                "files": {"file": ("bench.mp4", os.urandom(upload_size), "video/mp4")}}
+    raise ValueError(f"Unknown operation: {operation}")
+
+async def run_load(client, operation: str, usernames: List[str], concurrency: int,
+                   total_requests: int, upload_size: int) -> dict:
+    """Issue total_requests of one operation from `concurrency` workers, each its own user"""
+    tokens = []
+    if operation != "login":
+        for i in range(concurrency):
+            tokens.append(await login(client, usernames[i % len(usernames)]))
+
+    latencies = []
+    errors = 0
+    remaining = iter(range(total_requests))
+
+    async def worker(slot: int):
+        nonlocal errors
+        username = usernames[slot % len(usernames)]
+        for _ in remaining:
+            request = build_request(operation, username, tokens[slot] if tokens else "", upload_size)
+            start = time.perf_counter()
+            response = await client.request(**request)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(slot) for slot in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+async def benchmark_app(app_module, options: dict, usernames: List[str]) -> List[dict]:
+    import httpx
+
+    app = app_module.app
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # Warm-up: load indexes and caches outside the measured runs
+            token = await login(client, usernames[0])
+            for operation in ("me", "media", "stats", "love_meter"):
+                await client.request(**build_request(operation, usernames[0], token, 0))
+
+            for operation in options["operations"]:
+                for concurrency in options["concurrency"]:
+                    total = options["upload_requests"] if operation == "upload" else options["requests"]
+                    summary = await run_load(client, operation, usernames, concurrency, total,
+                                             options["upload_size"])
+                    summary.update(operation=operation, concurrency=concurrency)
+                    results.append(summary)
+                    print(f"  {operation:<11} c={concurrency:<4} {summary['throughput_rps']:>10.1f} req/s  "
+                          f"p50={summary['latency_ms']['p50']:.2f}ms  p99={summary['latency_ms']['p99']:.2f}ms"
+                          f"{'  errors=%d' % summary['errors'] if summary['errors'] else ''}", flush=True)
+    return results
+
+def measure_store_io(app_module) -> dict:
+    """Time one full parse and one full rewrite of media.json with the app's encoder"""
+    start = time.perf_counter()
+    data = app_module.load_json(Path("media.json"), {"media": []})
+    load_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    app_module.save_json(Path("media.json"), data)
+    save_seconds = time.perf_counter() - start
+    return {
+        "load_seconds": round(load_seconds, 4),
+        "save_seconds": round(save_seconds, 4),
+        "bytes_written": Path("media.json").stat().st_size,
+    }
+
+def run_dataset(records: int, options: dict) -> dict:
+    """Generate one dataset in a scratch directory and benchmark the app against it"""
+    workdir = Path(tempfile.mkdtemp(prefix="love-album-bench-"))
+    try:
+        shutil.copytree(REPO_DIR / "static", workdir / "static")
+        shutil.copytree(REPO_DIR / "templates", workdir / "templates")
+        os.chdir(workdir)
+        os.environ["STORAGE_BACKEND"] = options["backend"]
+        os.environ["JSON_BACKEND"] = options["json_backend"]
+        users = min(options["users"], records)
+
+        start = time.perf_counter()
+        user_list = generate_dataset(workdir, records, users, options["seed"])
+        generate_seconds = time.perf_counter() - start
+        dataset_bytes = sum(p.stat().st_size for p in workdir.glob("*.json"))
+
+        sys.path.insert(0, str(REPO_DIR))
+        start = time.perf_counter()
+        import app as app_module
+        if options["backend"] == "sqlite":
+            app_module.migrate_json_to_sqlite()
+        setup_seconds = time.perf_counter() - start
+        store_io = measure_store_io(app_module)
+
+        encoder = "orjson" if app_module.FAST_JSON else "json"
+        print(f"records={records} users={users} dataset={dataset_bytes / 1e6:.1f} MB "
+              f"(generated in {generate_seconds:.1f}s) encoder={encoder} "
+              f"load={store_io['load_seconds']:.3f}s save={store_io['save_seconds']:.3f}s", flush=True)
+        usernames = [user["username"] for user in user_list]
+        results = asyncio.run(benchmark_app(app_module, options, usernames))
+        for result in results:
+            result["records"] = records
+        return {
+            "records": records,
+            "users": users,
+            "json_backend": options["json_backend"],
+            "encoder": encoder,
+            "store_io": store_io,
+            "dataset_bytes": dataset_bytes,
+            "generate_seconds": round(generate_seconds, 3),
+            "setup_seconds": round(setup_seconds, 3),
+            "results": results,
+        }
+    finally:
+        os.chdir(REPO_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ==================== Entry Point ====================
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Love Album API in-process")
+    parser.add_argument("--records", type=int, nargs="+", default=[1000, 10000],
+                        help="records per collection (media, notes, kisses); one run per size")
+    parser.add_argument("--users", type=int, default=100, help="users the records are spread across")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per operation and concurrency level")
+    parser.add_argument("--upload-requests", type=int, default=50)
+    parser.add_argument("--upload-size", type=int, default=256 * 1024, help="bytes per uploaded file")
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=OPERATIONS)
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--json-backends", nargs="+", choices=["auto", "stdlib"], default=["auto"],
+                        help="JSON_BACKEND values to run each dataset with (auto uses orjson when installed)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="benchmark-results.json")
+    args = parser.parse_args()
+
+    options = {
+        "users": args.users,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "upload_requests": args.upload_requests,
+        "upload_size": args.upload_size,
+        "operations": args.operations,
+        "backend": args.backend,
+        "json_backends": args.json_backends,
+        "seed": args.seed,
+    }
+    datasets = []
+    for records in args.records:
+        for json_backend in args.json_backends:
+            # A fresh interpreter per run so module-level state and caches never leak between runs
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                run_options = dict(options, json_backend=json_backend)
+                datasets.append(pool.submit(run_dataset, records, run_options).result())
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "options": options,
+        },
+        "datasets": datasets,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Regression checks for the store invariants that are easiest to break.
+
+Each check runs in a fresh process against a scratch directory: the app is
+imported there with the chosen storage backend and driven directly or
+in-process through FastAPI's TestClient. Exits non-zero if any check fails.
+
+    python check_invariants.py
+    python check_invariants.py --backend sqlite --checks kiss_log_replay
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import hashlib
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import traceback
+import uuid
+
+REPO_DIR = Path(__file__).resolve().parent
+CHECKS = {}  # name -> function(app_module)
+
+
+def check(function):
+    CHECKS[function.__name__] = function
+    return function
+
+def expect(condition: bool, message: str):
+    if not condition:
+        raise AssertionError(message)
+
+
+# ==================== Event Log Checks ====================
+
+def simulate_compaction_crash(log, mutate=None):
+    """Compact, then put the old log back: a crash after the snapshot write but before the swap"""
+    if mutate:
+        mutate()
+    with open(log.log_path, "rb") as f:
+        leftover = f.read()
+    log.compact()
+    with open(log.log_path, "wb") as f:
+        f.write(leftover)
+    log.invalidate()  # as a restarted process would: snapshot plus the whole log
+
+@check
+def kiss_log_replay(app):
+    log = app.kiss_log
+    for _ in range(3):
+        log.append({"id": str(uuid.uuid4()), "from": "prem", "to": "nisha",
+                    "created_at": "2026-01-01T00:00:00", "user_id": "u1"})
+    simulate_compaction_crash(log)
+    expect(log.count("u1") == 3, f"replayed log duplicated kisses: {log.count('u1')} != 3")
+    log.compact()
+    stored = [k for k in app.storage.find("kisses") if k["user_id"] == "u1"]
+    expect(len(stored) == 3, f"snapshot holds {len(stored)} kisses after recompaction, expected 3")
+
+@check
+def mood_log_replay(app):
+    log = app.mood_log
+    mood = {"mood": "happy", "message": "", "author": "prem", "date": "2026-01-01",
+            "created_at": "2026-01-01T00:00:00", "user_id": "u1"}
+    # Superseded within the log, and a log record superseding a snapshot record
+    log.append(dict(mood, id="m1"))
+    log.append(dict(mood, id="m2", mood="calm"))
+    simulate_compaction_crash(log)
+    expect([m.mood for m in log.find("u1")] == ["calm"], "replay resurrected a superseded mood")
+    log.compact()
+    simulate_compaction_crash(log, lambda: log.append(dict(mood, id="m3", mood="loved")))
+    expect([m.mood for m in log.find("u1")] == ["loved"], "replay lost the mood superseding the snapshot")
+    log.compact()
+    stored = [m["mood"] for m in app.storage.find("moods") if m["user_id"] == "u1"]
+    expect(stored == ["loved"], f"snapshot holds {stored}, expected ['loved']")
+
+
+# ==================== Blob Checks ====================
+
+def logged_in_client(app):
+    from fastapi.testclient import TestClient
+    client = TestClient(app.app)
+    client.post("/api/signup", data={"username": "check", "email": "check@example.com", "password": "pw"})
+    client.post("/api/login", data={"username": "check", "password": "pw"})
+    return client
+
+def blob_refs(app, filename: str) -> int:
+    blob = app.storage.get("blobs", filename)
+    return blob["refs"] if blob else 0
+
+@check
+def blob_duplicate_upload_delete(app):
+    with logged_in_client(app) as client:
+        # Videos, so no metadata job is still starting in the process pool at shutdown
+        data = b"duplicate"
+        first = client.post("/api/upload", files={"file": ("a.mp4", data, "video/mp4")}).json()
+        second = client.post("/api/upload", files={"file": ("b.mp4", data, "video/mp4")}).json()
+        filename = first["filename"]
+        path = app.UPLOAD_DIR / "videos" / filename
+        expect(second["filename"] == filename, "identical uploads were not deduplicated")
+        expect(blob_refs(app, filename) == 2, f"expected 2 refs, found {blob_refs(app, filename)}")
+        client.delete(f"/api/media/{first['id']}")
+        expect(path.exists() and blob_refs(app, filename) == 1, "deleting one copy removed the shared blob")
+        client.delete(f"/api/media/{second['id']}")
+        expect(not path.exists() and blob_refs(app, filename) == 0, "deleting the last copy left the blob behind")
+
+@check
+def blob_release_on_failed_insert(app):
+    with logged_in_client(app) as client:
+        original = app.storage.insert_many
+
+        def failing_insert(collection, records):
+            if collection == "media":
+                raise RuntimeError("simulated write failure")
+            return original(collection, records)
+
+        app.storage.insert_many = failing_insert
+        try:
+            results = client.post("/api/upload-multiple", files=[
+                ("files", ("a.jpg", b"\xff\xd8failed-a", "image/jpeg")),
+                ("files", ("b.mp4", b"failed-b", "video/mp4")),
+            ]).json()["results"]
+        finally:
+            app.storage.insert_many = original
+        expect(not any(result["success"] for result in results), "failed batch reported success")
+        expect(not app.storage.find("blobs"), "failed insert leaked blob references")
+        leftover = [p.name for d in ("images", "videos") for p in (app.UPLOAD_DIR / d).iterdir()]
+        expect(not leftover, f"failed insert left files behind: {leftover}")
+
+@check
+def blob_store_delete_race(app):
+    """Concurrent store and release of one blob: it must exist whenever it is referenced"""
+    directory = app.UPLOAD_DIR / "images"
+    content = b"\xff\xd8raced"
+    filename = f"{hashlib.sha256(content).hexdigest()}.jpg"
+    item = {"filename": filename, "file_type": "image"}
+    errors = []
+
+    def worker():
+        for _ in range(50):
+            staging = directory / f".{uuid.uuid4().hex}.jpg.staging"
+            staging.write_bytes(content)
+            app.commit_blob(staging, directory / filename)
+            if not (directory / filename).exists():
+                errors.append("blob unlinked while still referenced")
+            app.discard_blob(item)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    expect(not errors, f"{len(errors)} times: {errors[0] if errors else ''}")
+    expect(blob_refs(app, filename) == 0 and not (directory / filename).exists(),
+           "references or file left after every holder released the blob")
+
+
+# ==================== Runner ====================
+
+def run_check(name: str, backend: str, workdir: Path) -> str:
+    """Run one check in a scratch directory; returns a traceback, or "" when it passed"""
+    try:
+        shutil.copytree(REPO_DIR / "static", workdir / "static")
+        shutil.copytree(REPO_DIR / "templates", workdir / "templates")
+        os.chdir(workdir)
+        os.environ["STORAGE_BACKEND"] = backend
+        sys.path.insert(0, str(REPO_DIR))
+        import app as app_module
+        CHECKS[name](app_module)
+        return ""
+    except Exception:
+        return traceback.format_exc()
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the Love Album store invariants")
+    parser.add_argument("--backend", nargs="+", choices=["json", "sqlite"], default=["json", "sqlite"])
+    parser.add_argument("--checks", nargs="+", choices=sorted(CHECKS), default=list(CHECKS))
+    args = parser.parse_args()
+
+    failed = 0
+    for backend in args.backend:
+        for name in args.checks:
+            # A fresh interpreter per check so module-level state never leaks between them;
+            # the scratch directory outlives it, and the app's own process pool with it
+            workdir = Path(tempfile.mkdtemp(prefix="love-album-check-"))
+            try:
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    error = pool.submit(run_check, name, backend, workdir).result()
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+            print(f"{'FAIL' if error else 'ok  '} {name} [{backend}]")
+            if error:
+                failed += 1
+                print(error)
+    print(f"{failed} failed" if failed else "All checks passed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
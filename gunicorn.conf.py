@@ -0,0 +1,35 @@
+"""Gunicorn settings for serving the album from several worker processes.
+
+    pip install gunicorn uvicorn-worker
+    gunicorn -c gunicorn.conf.py app:app
+
+Workers coordinate through the store file locks (or SQLite with
+STORAGE_BACKEND=sqlite), version stamps for their caches and the file
+pub/sub backend for live updates; see "Worker Coordination" in app.py.
+
+Cache invalidation is per collection: a media write in any worker makes
+every other worker rebuild its media, search and date indexes on next
+use, which on the JSON backend means re-reading media.json. Extra
+workers therefore help read-heavy traffic far more than upload-heavy
+traffic.
+
+Metrics are kept per worker: a /metrics scrape reports only the worker
+that answers it (app_worker_info gives its pid), so scrape each worker or
+run a single one when exact totals matter.
+"""
+
+import multiprocessing
+import os
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Each worker opens its own SQLite connection and process pool, so load the
+# app after forking rather than in the master
+preload_app = False
+timeout = 120
+graceful_timeout = 30
+
+# app.py sizes its process pool from this; coordination is always on
+os.environ["WEB_CONCURRENCY"] = str(workers)
@@ -227,7 +227,7 @@ function createGalleryItem(item, index) {
   const authorLabel = createAuthorLabel(author);
 
   div.innerHTML = `
-    <img src="${item.url}" alt="${item.caption || 'Memory'}" loading="lazy" onerror="this.style.display='none'; this.nextElementSibling.innerHTML='<div style=\"display:flex;align-items:center;justify-content:center;height:100%;color:rgba(255,255,255,0.5);\"><i class=\"fas fa-image\"></i></div>'">
+    <img ${thumbnailAttrs(item)} alt="${item.caption || 'Memory'}" loading="lazy" onerror="this.style.display='none'; this.nextElementSibling.innerHTML='<div style=\"display:flex;align-items:center;justify-content:center;height:100%;color:rgba(255,255,255,0.5);\"><i class=\"fas fa-image\"></i></div>'">
     ${authorLabel}
     <div class="gallery-overlay">
       <div class="overlay-content">
@@ -1302,6 +1302,17 @@ function updateUIForCurrentUser() {
   });
 }
 
+// Responsive thumbnail sources for an image item (falls back to the original)
+function thumbnailAttrs(item, sizes = '(max-width: 767px) 50vw, 320px') {
+  // Stored dimensions let the browser reserve the grid cell before the image loads
+  const dimensions = item.width && item.height ? ` width="${item.width}" height="${item.height}"` : '';
+  if (!item.thumbnails) return `src="${item.url}"${dimensions}`;
+  const srcset = Object.entries(item.thumbnails)
+    .map(([width, url]) => `${url} ${width}w`)
+    .join(', ');
+  return `src="${item.thumbnails['640'] || item.url}" srcset="${srcset}" sizes="${sizes}"${dimensions}`;
+}
+
 function getAuthorFromItem(item) {
   // If item has author field, use it
   if (item.author) return item.author;
@@ -1409,7 +1420,7 @@ async function loadMemoryOfDay() {
         }) : '';
         
         memoryContainer.innerHTML = `
-          <img src="${dailyMemory.url}" alt="${dailyMemory.caption || 'Memory'}" style="width: 100%; max-width: 300px; border-radius: 15px; margin-bottom: 15px;">
+          <img ${thumbnailAttrs(dailyMemory, '300px')} alt="${dailyMemory.caption || 'Memory'}" style="width: 100%; max-width: 300px; border-radius: 15px; margin-bottom: 15px;">
           <h4 style="color: #ffd700; margin-bottom: 10px;">${dailyMemory.caption || 'Our Special Memory'}</h4>
           <p style="color: rgba(255,255,255,0.7); font-size: 0.9rem;">${formattedDate}</p>
         `;
@@ -1774,6 +1785,27 @@ function showRandomSurprise() {
   }
 }
 
+// ===== Live Updates =====
+// Server-Sent Events push what the partner does, so nothing needs re-polling
+function connectLiveUpdates() {
+  if (!window.EventSource) return;
+  const source = new EventSource(`${API_BASE}/api/events`);
+
+  source.addEventListener('kiss', () => {
+    loadKissCounter();
+    loadLoveMeter();
+  });
+  source.addEventListener('mood', () => loadMoods());
+  source.addEventListener('note', () => {
+    loadLoveNotes();
+    loadLoveMeter();
+  });
+  source.addEventListener('timeline', () => {
+    loadTimeline();
+    loadLoveMeter();
+  });
+}
+
 // ===== Initialize on Load =====
 document.addEventListener('DOMContentLoaded', () => {
   // Initialize upload elements
@@ -1809,6 +1841,7 @@ document.addEventListener('DOMContentLoaded', () => {
   loadLoveMeter();
   loadKissCounter();
   loadMoods();
+  connectLiveUpdates();
   
   // Show random surprise messages
   setTimeout(showRandomSurprise, 30000); // After 30 seconds